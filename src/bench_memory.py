@@ -0,0 +1,94 @@
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import timedelta
+
+from domain import Track, YoutubeMedialink
+from storage import TemporaryMusicStorage
+
+# Memory of a crawl held in a TemporaryMusicStorage: the old record layout against slotted, frozen records, in memory
+# and spilling to disk, including a streamed snapshot.
+# Usage: python3 bench_memory.py [number of tracks, default 1000000]
+
+NUM_ARTISTS = 50000
+
+
+class DictTrack:
+    # the record layout before slotting: per-instance __dict__, lists and medialinks as dicts
+    def __init__(self):
+        self.id = ""
+        self.name = ""
+        self.artists = []
+        self.labels = []
+        self.duration = -1
+        self.tracklists = []
+        self.remixes = []
+        self.remix_of = []
+        self.mashups = []
+        self.mashup_tracks = []
+        self.medialinks = []
+
+
+def fill(track, i: int):
+    # every id is a fresh string, like the ones a parser cuts out of a page
+    track.id = "t%x" % i
+    track.name = "Artist %d - Track %d" % (i % NUM_ARTISTS, i)
+    track.duration = timedelta(seconds=180 + i % 300)
+    track.artists.append("a%x" % (i % NUM_ARTISTS))
+    track.artists.append("a%x" % ((i * 7) % NUM_ARTISTS))
+    track.labels.append("l%x" % (i % 1000))
+    for j in range(3):
+        track.tracklists.append("tl%x" % ((i + j * 7919) % 200000))
+    track.remixes.append("t%x" % ((i * 31) % 1000000))
+    return track
+
+
+def build_dict_tracks(n: int):
+    store = {}
+    for i in range(n):
+        track = fill(DictTrack(), i)
+        track.medialinks.append(YoutubeMedialink("yt%x" % i).get_obj())
+        store[track.id] = track
+    return store
+
+
+def build_store(n: int, spill_folder=None):
+    store = TemporaryMusicStorage(spill_folder)
+    for i in range(n):
+        track = fill(Track(), i)
+        track.add_medialink(YoutubeMedialink("yt%x" % i))
+        store.put_track(track.freeze())
+    return store
+
+
+def max_rss_mib() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_scenario(scenario: str, n: int):
+    baseline = max_rss_mib()
+    start = time.time()
+    with tempfile.TemporaryDirectory() as folder:
+        if scenario == "dict":
+            build_dict_tracks(n)
+        else:
+            store = build_store(n, folder if scenario == "spill" else None)
+            built = time.time()
+            rss = max_rss_mib()
+            store.store_to_disk(folder + "/snapshot.json")
+            print("%-8s peak RSS %8.1f MiB after build (%5.1f s), %8.1f MiB after streaming the snapshot (%5.1f s)"
+                  % (scenario, rss - baseline, built - start, max_rss_mib() - baseline, time.time() - built))
+            return
+    print("%-8s peak RSS %8.1f MiB after build (%5.1f s)" % (scenario, max_rss_mib() - baseline, time.time() - start))
+
+
+# every scenario runs in its own process, the peak RSS of a process never goes down
+num_tracks = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+if len(sys.argv) > 2:
+    run_scenario(sys.argv[2], num_tracks)
+else:
+    print("%d tracks" % num_tracks)
+    for name in ["dict", "slotted", "spill"]:
+        subprocess.run([sys.executable, __file__, str(num_tracks), name], check=True)
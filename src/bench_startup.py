@@ -0,0 +1,37 @@
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Wall clock time of short cli.py commands, each in a fresh interpreter, against importing the crawl modules.
+# Usage: python3 bench_startup.py [runs per command, default 20]
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def measure(argv: list, runs: int) -> list:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + argv, cwd=HERE, check=True, stdout=subprocess.DEVNULL)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+runs = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+with tempfile.TemporaryDirectory() as folder:
+    for filename in ["tracks.txt", "artists.txt", "labels.txt", "tracklists.txt"]:
+        with open(os.path.join(folder, filename), "w") as file:
+            file.write('{"id": "x", "name": "x"}\n' * 1000)
+
+    commands = {
+        "python -c pass": ["-c", "pass"],
+        "cli.py --help": ["cli.py", "--help"],
+        "cli.py stats": ["cli.py", "stats", "--data", folder],
+        "import crawler": ["-c", "import crawler"],
+    }
+    for name, argv in commands.items():
+        timings = measure(argv, runs)
+        print("%-16s min %6.1f ms  median %6.1f ms" % (name, min(timings), statistics.median(timings)))
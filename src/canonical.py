@@ -0,0 +1,60 @@
+import json
+import os
+
+from domain import Artist
+
+
+class ArtistCanonicalizer:
+    # Union-find over artist ids that name the same artist (aliases and renames). The smallest id of a group is its
+    # root, so the canonical id of a group does not depend on the order in which the relationships were discovered.
+
+    def __init__(self):
+        self.parent = {}
+        self.members = {}
+
+    def find(self, artistid: str) -> str:
+        root = artistid
+        while root in self.parent:
+            root = self.parent[root]
+        while artistid != root:
+            self.parent[artistid], artistid = root, self.parent[artistid]
+        return root
+
+    def union(self, a: str, b: str) -> str:
+        ra = self.find(a)
+        rb = self.find(b)
+        if ra == rb:
+            return ra
+        if rb < ra:
+            ra, rb = rb, ra
+        self.parent[rb] = ra
+        members = self.members.setdefault(ra, [ra])
+        members.extend(self.members.pop(rb, [rb]))
+        return ra
+
+    def group(self, artistid: str) -> list:
+        root = self.find(artistid)
+        return self.members.get(root, [root])
+
+    def add_artist(self, artist: Artist):
+        self.add_relations(artist.id, artist.aliases)
+        self.add_relations(artist.id, artist.renamed_to)
+
+    def add_obj(self, obj: dict):
+        self.add_relations(obj["id"], obj.get("aliases", []))
+        self.add_relations(obj["id"], obj.get("renamed_to", []))
+
+    def add_relations(self, artistid: str, others):
+        for other in others:
+            self.union(artistid, other)
+
+    def export_groups(self, filename: str):
+        # written next to the old file and swapped in, a crash during a checkpoint leaves the previous groups intact
+        with open(filename + ".tmp", "w") as file:
+            json.dump(list(self.members.values()), file)
+        os.replace(filename + ".tmp", filename)
+
+    def import_groups(self, filename: str):
+        with open(filename, "r") as file:
+            for group in json.load(file):
+                self.add_relations(group[0], group[1:])
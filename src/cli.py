@@ -0,0 +1,156 @@
+import argparse
+import configparser
+import sys
+
+# Every subcommand imports what it needs when it runs, so "stats" or "--help" never pay for bs4, requests or pyarrow.
+
+DATAFOLDER = "../results"
+
+
+def run_crawl(args):
+    from crawler import go_real
+    # options that were not given keep the defaults of go_real
+    options = {"start_tracklist": args.start, "scrape_timeout": args.scrape_timeout, "break_after": args.limit,
+               "baseurl": args.baseurl}
+    go_real(args.data, canonicalize=not args.no_canonicalize, http2=args.http2,
+            **{key: value for key, value in options.items() if value is not None})
+
+
+def run_bootstrap(args):
+    from crawler import bootstrap_frontier
+    options = {"scrape_timeout": args.scrape_timeout, "baseurl": args.baseurl}
+    bootstrap_frontier(args.data, args.sitemap, canonicalize=not args.no_canonicalize,
+                       **{key: value for key, value in options.items() if value is not None})
+
+
+def run_export(args):
+    if args.format == "ttl":
+        from ttl_export import TTLConverter
+        TTLConverter(args.data, canonicalize=not args.no_canonicalize).export(args.output or args.data + "/data.ttl")
+    elif args.format == "parquet":
+        from parquet_export import ParquetExporter
+        ParquetExporter(args.data).export(args.output or args.data + "/parquet")
+    else:
+        from graph_export import GraphImportExporter
+        GraphImportExporter(args.data).export(args.output or args.data + "/graph")
+
+
+def run_diff(args):
+    import json
+    from snapshot_diff import SnapshotDiff
+    counts = SnapshotDiff(args.old, args.data, run_size=args.run_size).diff(args.output or args.data + "/changes.txt")
+    print(json.dumps(counts, indent=2))
+
+
+def run_compact(args):
+    import json
+    from maintenance import compact
+    print(json.dumps(compact(args.data), indent=2))
+
+
+def run_stats(args):
+    import json
+    from maintenance import stats
+    print(json.dumps(stats(args.data), indent=2))
+
+
+def _boolean(value: str) -> bool:
+    if value.lower() not in configparser.ConfigParser.BOOLEAN_STATES:
+        raise ValueError("not a boolean: '%s'" % value)
+    return configparser.ConfigParser.BOOLEAN_STATES[value.lower()]
+
+
+def _add_option(options: dict, subparser: argparse.ArgumentParser, flag: str, **kwargs):
+    # adds the option and notes how a value of it from the config file is converted: flags are booleans, repeatable
+    # options take a whitespace separated list, the others their type
+    subparser.add_argument(flag, **kwargs)
+    if kwargs.get("action") == "store_true":
+        convert = _boolean
+    elif kwargs.get("action") == "append":
+        convert = str.split
+    else:
+        convert = kwargs.get("type", str)
+    options[flag[2:]] = convert
+
+
+def build_parser(config_options: dict = None) -> argparse.ArgumentParser:
+    # config_options is filled with subcommand -> (its parser, {long option name -> converter}) for apply_config
+    config_options = config_options if config_options is not None else {}
+    parser = argparse.ArgumentParser(prog="cli.py", description="Scrape 1001tracklists and work with the results")
+    parser.add_argument("--config", help="INI file with a section per subcommand, keys are the long option names")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    def add_subcommand(name: str, func, description: str):
+        subparser = subparsers.add_parser(name, help=description)
+        subparser.set_defaults(func=func)
+        options = {}
+        config_options[name] = (subparser, options)
+        _add_option(options, subparser, "--data", default=DATAFOLDER, help="folder with the results")
+        return subparser, options
+
+    crawl, options = add_subcommand("crawl", run_crawl, "crawl the site, resuming from todo.json")
+    _add_option(options, crawl, "--start", help="tracklist to start from if there is no todo.json")
+    _add_option(options, crawl, "--scrape-timeout", type=float, help="seconds to wait between two requests")
+    _add_option(options, crawl, "--limit", type=int,
+                help="stop after this many rounds instead of running until stopped")
+    _add_option(options, crawl, "--no-canonicalize", action="store_true",
+                help="also fetch alias and renamed artist pages")
+    _add_option(options, crawl, "--http2", action="store_true",
+                help="fetch over HTTP/2 with compressed transfer (needs httpx)")
+    _add_option(options, crawl, "--baseurl", help="site to crawl, e.g. a local stand-in server")
+
+    bootstrap, options = add_subcommand("bootstrap", run_bootstrap,
+                                        "fill todo.json with the entities listed in the site's sitemaps")
+    _add_option(options, bootstrap, "--sitemap", action="append",
+                help="sitemap or sitemap index url, can be repeated, defaults to the ones in robots.txt")
+    _add_option(options, bootstrap, "--scrape-timeout", type=float, help="seconds to wait between two sitemaps")
+    _add_option(options, bootstrap, "--no-canonicalize", action="store_true",
+                help="also queue aliases of crawled artists")
+    _add_option(options, bootstrap, "--baseurl", help="site to read the sitemaps of, e.g. a local stand-in server")
+
+    export, options = add_subcommand("export", run_export,
+                                     "convert the results to turtle, parquet or graph import files")
+    export.add_argument("format", choices=["ttl", "parquet", "graph"])
+    _add_option(options, export, "--output", help="file (ttl) or folder (parquet, graph), defaults to the data folder")
+    _add_option(options, export, "--no-canonicalize", action="store_true", help="ttl: keep aliases as separate nodes")
+
+    diff, options = add_subcommand("diff", run_diff,
+                                   "write the records added, removed or modified since an older snapshot")
+    diff.add_argument("old", help="folder with the older results, --data holds the newer ones")
+    _add_option(options, diff, "--output", help="changelog file, defaults to changes.txt in the data folder")
+    _add_option(options, diff, "--run-size", type=int, default=100000, help="records sorted in memory at a time")
+
+    add_subcommand("compact", run_compact, "drop duplicate records, failures and finished todo ids")
+    add_subcommand("stats", run_stats, "count records, todo ids and failures")
+    return parser
+
+
+def apply_config(parser: argparse.ArgumentParser, config_options: dict, filename: str):
+    # values of [DEFAULT] and of the section named after a subcommand become the defaults of its options
+    config = configparser.ConfigParser()
+    if not config.read(filename):
+        parser.error("cannot read config file '%s'" % filename)
+    for name, (subparser, options) in config_options.items():
+        section = config[name] if config.has_section(name) else config[config.default_section]
+        defaults = {}
+        for key, convert in options.items():
+            if key in section:
+                try:
+                    defaults[key.replace("-", "_")] = convert(section[key])
+                except ValueError as e:
+                    parser.error("invalid value for '%s' in section [%s] of '%s': %s" % (key, name, filename, e))
+        subparser.set_defaults(**defaults)
+
+
+def main(argv=None):
+    config_options = {}
+    parser = build_parser(config_options)
+    known, _ = parser.parse_known_args(argv)
+    if known.config:
+        apply_config(parser, config_options, known.config)
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,174 @@
+import logging
+import os
+import time
+
+from canonical import ArtistCanonicalizer
+from domain import EntityNotFoundError, RateLimitException
+from failures import FailureLedger, OutageDetector, RetryQueue, CONNECTION_ERRORS, PARSE_ERRORS
+from graceful import GracefulKiller
+from storage import TrackingMissingMusicStorage, FileSystemMusicStorage
+from tl1001 import TLBackend, BASEURL
+from transport import http2_session
+
+SCRAPE_TIMEOUT = 5.5
+BREAK_AFTER_NUM_ELEMENTS = -1
+START_TRACKLIST = "tcblybt"
+CANONICALIZE_ARTISTS = True
+USE_HTTP2 = False
+
+
+def put_harvested(musicstore: TrackingMissingMusicStorage, tlb: TLBackend):
+    for label in tlb.pop_harvested():
+        if not musicstore.has_label(label.id):
+            musicstore.put_label(label)
+
+
+def crawl_entity(musicstore: TrackingMissingMusicStorage, tlb: TLBackend, retries: RetryQueue, ledger: FailureLedger,
+                 entity_type: str, entityid: str, scrape_timeout=SCRAPE_TIMEOUT, outage: OutageDetector = None):
+    logger = logging.getLogger("recursive_worker")
+    fetch, put = {
+        "tracklist": (tlb.get_tracklist, musicstore.put_tracklist),
+        "track": (tlb.get_track, musicstore.put_track),
+        "artist": (tlb.get_artist, musicstore.put_artist),
+        "label": (tlb.get_label, musicstore.put_label)
+    }[entity_type]
+    if ledger.has_failed(entity_type, entityid) or getattr(musicstore, "has_" + entity_type)(entityid):
+        return
+    if (entity_type, entityid) in retries:
+        # popped from the frontier while its retry is due later, the retry queue hands it back
+        return
+    outage = outage if outage is not None else OutageDetector()
+    try:
+        entity = fetch(entityid)
+    except EntityNotFoundError as e:
+        outage.succeeded()
+        ledger.record(entity_type, entityid, str(e))
+    except RateLimitException:
+        todo(musicstore, entity_type).add(entityid)
+        raise
+    except CONNECTION_ERRORS as e:
+        # never ends up in the ledger, an outage longer than the backoff must not blacklist the ids it hit
+        outage.failed()
+        attempt = retries.attempts_of(entity_type, entityid) + 1
+        retries.failed(entity_type, entityid, give_up=False)
+        logger.warning("Fetching %s '%s' failed (attempt %d), retrying later: %r", entity_type, entityid, attempt, e)
+    except PARSE_ERRORS as e:
+        outage.succeeded()
+        attempt = retries.attempts_of(entity_type, entityid) + 1
+        if retries.failed(entity_type, entityid):
+            logger.warning("Fetching %s '%s' failed (attempt %d), retrying later: %r", entity_type, entityid, attempt, e)
+        else:
+            ledger.record(entity_type, entityid, "failed %d times, last error: %r" % (attempt, e))
+    else:
+        outage.succeeded()
+        logger.debug(entity)
+        retries.succeeded(entity_type, entityid)
+        put_harvested(musicstore, tlb)
+        put(entity)
+    time.sleep(scrape_timeout)
+
+
+def todo(musicstore: TrackingMissingMusicStorage, entity_type: str) -> set:
+    return getattr(musicstore, "todo_" + entity_type + "s")
+
+
+def work_recursive(musicstore: TrackingMissingMusicStorage, retries: RetryQueue, ledger: FailureLedger, tlb: TLBackend,
+                   scrape_timeout=SCRAPE_TIMEOUT, break_after=BREAK_AFTER_NUM_ELEMENTS):
+    killer = GracefulKiller()
+
+    logger = logging.getLogger("recursive_worker")
+    logger.setLevel("INFO")
+    logger.addHandler(logging.StreamHandler())
+
+    outage = OutageDetector()
+    counter = 0
+    while (break_after == -1 or counter < break_after) and not killer.kill_now:
+        try:
+            for entity_type in ["tracklist", "track", "artist", "label"]:
+                if len(todo(musicstore, entity_type)) > 0 and not outage.is_down():
+                    crawl_entity(musicstore, tlb, retries, ledger, entity_type, todo(musicstore, entity_type).pop(),
+                                 scrape_timeout, outage)
+
+            due = retries.pop_due()
+            if due is not None and not outage.is_down():
+                crawl_entity(musicstore, tlb, retries, ledger, *due, scrape_timeout, outage)
+
+            if outage.is_down():
+                logger.warning("%d connection errors in a row, pausing for %d seconds", outage.consecutive,
+                               outage.pause)
+                killer.sleep(outage.pause)
+                outage.probe()
+
+            logger.info("TODO queue sizes: tracks=%d, artists=%d, labels=%d, tracklists=%d, retries=%d",
+                        len(musicstore.todo_tracks),
+                        len(musicstore.todo_artists),
+                        len(musicstore.todo_labels),
+                        len(musicstore.todo_tracklists),
+                        len(retries))
+
+            counter = counter + 1
+        except RateLimitException:
+            logger.warning("Ran into ratelimit!!! Waiting for 61 minutes")
+            killer.sleep(60 * 61)
+
+
+def open_musicstore(datafolder: str, canonicalize=CANONICALIZE_ARTISTS) -> TrackingMissingMusicStorage:
+    canonicalfile = datafolder + "/canonical.json"
+    canonicalizer = None
+    if canonicalize:
+        canonicalizer = ArtistCanonicalizer()
+        if os.path.isfile(canonicalfile):
+            canonicalizer.import_groups(canonicalfile)
+
+    ledger = FailureLedger(datafolder + "/failed.txt")
+    realmusicstore = FileSystemMusicStorage(datafolder, append=True)
+    musicstore = TrackingMissingMusicStorage(realmusicstore, canonicalizer, ledger, RetryQueue())
+    if os.path.isfile(datafolder + "/todo.json"):
+        musicstore.import_todolist(datafolder + "/todo.json")
+    return musicstore
+
+
+def close_musicstore(musicstore: TrackingMissingMusicStorage, datafolder: str):
+    musicstore.export_todolist(datafolder + "/todo.json")
+    musicstore.ledger.flush()
+    if musicstore.canonicalizer is not None:
+        musicstore.canonicalizer.export_groups(datafolder + "/canonical.json")
+
+
+def go_real(datafolder="../results", start_tracklist=START_TRACKLIST, canonicalize=CANONICALIZE_ARTISTS,
+            scrape_timeout=SCRAPE_TIMEOUT, break_after=BREAK_AFTER_NUM_ELEMENTS, http2=USE_HTTP2, baseurl=BASEURL):
+    logger = logging.getLogger("main")
+    logger.addHandler(logging.StreamHandler())
+    logger.setLevel("INFO")
+    logger.info("Using data folder: " + datafolder)
+
+    musicstore = open_musicstore(datafolder, canonicalize)
+    if not os.path.isfile(datafolder + "/todo.json"):
+        musicstore.todo_tracklists.add(start_tracklist)
+    retries = musicstore.retries
+
+    tlb = TLBackend(baseurl, session=http2_session(baseurl) if http2 else None)
+    try:
+        work_recursive(musicstore, retries, musicstore.ledger, tlb, scrape_timeout, break_after)
+    finally:
+        if http2:
+            logger.info("Transferred: %s", tlb.session.stats.summary())
+        # ids waiting for a retry go back to the frontier, only their attempt count is lost
+        for entity_type, entityid in retries.pending():
+            todo(musicstore, entity_type).add(entityid)
+        close_musicstore(musicstore, datafolder)
+
+
+def bootstrap_frontier(datafolder="../results", sitemaps=None, canonicalize=CANONICALIZE_ARTISTS,
+                       scrape_timeout=SCRAPE_TIMEOUT, baseurl=BASEURL):
+    from sitemap import SitemapBootstrap
+    musicstore = open_musicstore(datafolder, canonicalize)
+    try:
+        SitemapBootstrap(musicstore, TLBackend(baseurl), scrape_timeout).bootstrap(sitemaps)
+    finally:
+        close_musicstore(musicstore, datafolder)
+
+# TODO: consider track Musicstyle table (2nx3up1x)
+# TODO: consider artist side table: Similar Artist Names (2k4skk7n)
+# TODO: consider track mode for artists: Other Produced Tracks (l116r4)
+
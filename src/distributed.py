@@ -0,0 +1,289 @@
+import logging
+import threading
+import time
+import uuid
+import zlib
+from collections import deque
+from multiprocessing.managers import BaseManager
+
+from domain import EntityNotFoundError, RateLimitException, RESULT_FILES, auto_str
+from failures import FailureLedger, OutageDetector, RetryQueue, CONNECTION_ERRORS, PARSE_ERRORS, NOT_FOUND, \
+    PARSE_FAILURE, CONNECTION_FAILURE
+from graceful import GracefulKiller
+from storage import TrackingMissingMusicStorage
+from tl1001 import TLBackend
+
+ENTITY_TYPES = ["tracklist", "track", "artist", "label"]
+
+
+@auto_str
+class Lease:
+    def __init__(self, leaseid: str, entity_type: str, shard: int, ids: list, worker: str, expires: float):
+        self.id = leaseid
+        self.entity_type = entity_type
+        self.shard = shard
+        self.ids = ids
+        self.worker = worker
+        self.expires = expires
+
+    def to_obj(self):
+        return {"lease": self.id, "type": self.entity_type, "shard": self.shard, "ids": self.ids,
+                "expires": self.expires}
+
+
+class CrawlCoordinator:
+    # Leased ids stay in the todo sets of the tracking storage, so an exported todo list never loses work that is
+    # currently leased. Claimable ids additionally wait in one queue per shard, a claim pops from the next shard with
+    # work instead of scanning the frontier. Queue entries are checked against the todo set when they are popped, ids
+    # that left the frontier in the meantime are skipped.
+
+    def __init__(self, musicstore: TrackingMissingMusicStorage, num_shards=16, batch_size=10, lease_timeout=600.0,
+                 ledger: FailureLedger = None, retries: RetryQueue = None):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.logger.setLevel("INFO")
+        self.logger.addHandler(logging.StreamHandler())
+        self.musicstore = musicstore
+        self.num_shards = num_shards
+        self.batch_size = batch_size
+        self.lease_timeout = lease_timeout
+        self.ledger = ledger
+        if retries is None:
+            retries = musicstore.retries if musicstore.retries is not None else RetryQueue()
+        self.retries = retries
+        self.lock = threading.Lock()
+        self.leases = {}
+        self.leased = {t: set() for t in ENTITY_TYPES}
+        self.queues = {t: [deque() for _ in range(num_shards)] for t in ENTITY_TYPES}
+        self.queued = {t: set() for t in ENTITY_TYPES}
+        self.next_shard = {t: 0 for t in ENTITY_TYPES}
+        self.next_type = 0
+        for entity_type in ENTITY_TYPES:
+            for entityid in self._todo(entity_type):
+                self._enqueue(entity_type, entityid)
+
+    def shard_of(self, entityid: str) -> int:
+        return zlib.crc32(entityid.encode("utf8")) % self.num_shards
+
+    def _todo(self, entity_type: str) -> set:
+        return getattr(self.musicstore, "todo_" + entity_type + "s")
+
+    def _enqueue(self, entity_type: str, entityid: str):
+        if entityid not in self.queued[entity_type] and entityid not in self.leased[entity_type]:
+            self.queued[entity_type].add(entityid)
+            self.queues[entity_type][self.shard_of(entityid)].append(entityid)
+
+    def _take(self, entity_type: str):
+        todo = self._todo(entity_type)
+        start = self.next_shard[entity_type]
+        for i in range(self.num_shards):
+            shard = (start + i) % self.num_shards
+            queue = self.queues[entity_type][shard]
+            ids = []
+            while queue and len(ids) < self.batch_size:
+                entityid = queue.popleft()
+                self.queued[entity_type].discard(entityid)
+                if entityid not in todo:
+                    continue
+                if self.ledger is not None and self.ledger.has_failed(entity_type, entityid):
+                    todo.discard(entityid)
+                    continue
+                if (entity_type, entityid) in self.retries:
+                    # back in the frontier through another page, the retry queue requeues it once it is due
+                    todo.discard(entityid)
+                    continue
+                ids.append(entityid)
+            if ids:
+                self.next_shard[entity_type] = (shard + 1) % self.num_shards
+                return shard, ids
+        return None, []
+
+    def _release(self, lease: Lease):
+        self.leased[lease.entity_type].difference_update(lease.ids)
+        # ids the worker did not get to are claimable again
+        for entityid in lease.ids:
+            if entityid in self._todo(lease.entity_type):
+                self._enqueue(lease.entity_type, entityid)
+
+    def expire_leases(self):
+        with self.lock:
+            now = time.time()
+            for lease in [l for l in self.leases.values() if l.expires < now]:
+                self.logger.warning("Lease %s of worker '%s' expired, reassigning %d %s ids",
+                                    lease.id, lease.worker, len(lease.ids), lease.entity_type)
+                del self.leases[lease.id]
+                self._release(lease)
+
+    def _requeue_due(self):
+        due = self.retries.pop_due()
+        while due is not None:
+            entity_type, entityid = due
+            if not getattr(self.musicstore, "has_" + entity_type)(entityid):
+                self._todo(entity_type).add(entityid)
+                self._enqueue(entity_type, entityid)
+            due = self.retries.pop_due()
+
+    def requeue_pending(self):
+        with self.lock:
+            for entity_type, entityid in self.retries.pending():
+                self._todo(entity_type).add(entityid)
+                self._enqueue(entity_type, entityid)
+
+    def claim(self, worker: str):
+        self.expire_leases()
+        with self.lock:
+            self._requeue_due()
+            for i in range(len(ENTITY_TYPES)):
+                entity_type = ENTITY_TYPES[(self.next_type + i) % len(ENTITY_TYPES)]
+                shard, ids = self._take(entity_type)
+                if ids:
+                    self.next_type = (self.next_type + i + 1) % len(ENTITY_TYPES)
+                    lease = Lease(uuid.uuid4().hex, entity_type, shard, ids, worker, time.time() + self.lease_timeout)
+                    self.leases[lease.id] = lease
+                    self.leased[entity_type].update(ids)
+                    self.logger.debug("Leased %s", lease)
+                    return lease.to_obj()
+            return None
+
+    def complete(self, leaseid: str, results: list, failed: list):
+        with self.lock:
+            lease = self.leases.pop(leaseid, None)
+            for entity_type, entity in results:
+                self._put(entity_type, entity)
+            for entity_type, entityid, reason, kind in failed:
+                self._fail(entity_type, entityid, reason, kind)
+            if lease is None:
+                self.logger.warning("Lease %s completed after it expired", leaseid)
+            else:
+                self._release(lease)
+
+    def _fail(self, entity_type: str, entityid: str, reason: str, kind: str):
+        # the id leaves the frontier, it comes back through the retry queue once its backoff is over
+        self._todo(entity_type).discard(entityid)
+        if kind == CONNECTION_FAILURE:
+            # no ledger entry for these, the id waits in the retry queue for as long as the site is unreachable
+            attempt = self.retries.attempts_of(entity_type, entityid) + 1
+            self.retries.failed(entity_type, entityid, give_up=False)
+            self.logger.warning("Fetching %s '%s' failed (attempt %d), retrying later: %s",
+                                entity_type, entityid, attempt, reason)
+            return
+        if kind == PARSE_FAILURE:
+            attempt = self.retries.attempts_of(entity_type, entityid) + 1
+            if self.retries.failed(entity_type, entityid):
+                self.logger.warning("Fetching %s '%s' failed (attempt %d), retrying later: %s",
+                                    entity_type, entityid, attempt, reason)
+                return
+            reason = "failed %d times, last error: %s" % (attempt, reason)
+        if self.ledger is not None:
+            self.ledger.record(entity_type, entityid, reason)
+        else:
+            self.logger.warning("Dropping %s '%s' from the frontier: %s", entity_type, entityid, reason)
+
+    def _put(self, entity_type: str, entity):
+        self.retries.succeeded(entity_type, entity.id)
+        if entity_type == "track" and not self.musicstore.has_track(entity.id):
+            self.musicstore.put_track(entity)
+        elif entity_type == "artist" and not self.musicstore.has_artist(entity.id):
+            self.musicstore.put_artist(entity)
+        elif entity_type == "label" and not self.musicstore.has_label(entity.id):
+            self.musicstore.put_label(entity)
+        elif entity_type == "tracklist" and not self.musicstore.has_tracklist(entity.id):
+            self.musicstore.put_tracklist(entity)
+        else:
+            return
+        # the only ids the storage adds to the frontier are the ones the record links to
+        for field, target in RESULT_FILES[entity_type][1].items():
+            todo = self._todo(target)
+            for entityid in getattr(entity, field):
+                if entityid in todo:
+                    self._enqueue(target, entityid)
+
+    def stats(self):
+        with self.lock:
+            obj = {t: len(self._todo(t)) for t in ENTITY_TYPES}
+            obj["leases"] = len(self.leases)
+            obj["retries"] = len(self.retries)
+            return obj
+
+
+class CoordinatorManager(BaseManager):
+    pass
+
+
+def serve_coordinator(coordinator: CrawlCoordinator, address, authkey: bytes) -> threading.Thread:
+    CoordinatorManager.register("coordinator", callable=lambda: coordinator)
+    server = CoordinatorManager(address=address, authkey=authkey).get_server()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return thread
+
+
+def connect_coordinator(address, authkey: bytes):
+    CoordinatorManager.register("coordinator")
+    manager = CoordinatorManager(address=address, authkey=authkey)
+    manager.connect()
+    return manager.coordinator()
+
+
+class CrawlWorker:
+
+    def __init__(self, coordinator, backend: TLBackend, name: str, scrape_timeout=5.5, idle_timeout=10.0):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.logger.setLevel("INFO")
+        self.logger.addHandler(logging.StreamHandler())
+        self.coordinator = coordinator
+        self.backend = backend
+        self.name = name
+        self.scrape_timeout = scrape_timeout
+        self.idle_timeout = idle_timeout
+        self.fetchers = {
+            "track": backend.get_track,
+            "artist": backend.get_artist,
+            "label": backend.get_label,
+            "tracklist": backend.get_tracklist
+        }
+
+    def run(self):
+        killer = GracefulKiller()
+        outage = OutageDetector()
+        while not killer.kill_now:
+            lease = self.coordinator.claim(self.name)
+            if lease is None:
+                killer.sleep(self.idle_timeout)
+                continue
+
+            entity_type = lease["type"]
+            results = []
+            failed = []
+            try:
+                for entityid in lease["ids"]:
+                    if killer.kill_now:
+                        break
+                    try:
+                        entity = self.fetchers[entity_type](entityid)
+                        outage.succeeded()
+                        results.extend(("label", label) for label in self.backend.pop_harvested())
+                        results.append((entity_type, entity))
+                    except EntityNotFoundError as e:
+                        outage.succeeded()
+                        failed.append((entity_type, entityid, str(e), NOT_FOUND))
+                    except CONNECTION_ERRORS as e:
+                        outage.failed()
+                        failed.append((entity_type, entityid, repr(e), CONNECTION_FAILURE))
+                    except PARSE_ERRORS as e:
+                        outage.succeeded()
+                        failed.append((entity_type, entityid, repr(e), PARSE_FAILURE))
+                    if outage.is_down():
+                        break
+                    killer.sleep(self.scrape_timeout)
+            except RateLimitException:
+                self.logger.warning("Ran into ratelimit!!! Returning lease and waiting for 61 minutes")
+                self.coordinator.complete(lease["lease"], results, failed)
+                killer.sleep(60 * 61)
+                continue
+            # ids the lease did not get to stay in the frontier
+            self.coordinator.complete(lease["lease"], results, failed)
+            if outage.is_down():
+                self.logger.warning("%d connection errors in a row, pausing for %d seconds", outage.consecutive,
+                                    outage.pause)
+                killer.sleep(outage.pause)
+                outage.probe()
@@ -1,18 +1,57 @@
+import sys
 from abc import ABC, abstractmethod
 
 
 def auto_str(cls):
     def __str__(self):
+        if hasattr(self, "__dict__"):
+            items = vars(self).items()
+        else:
+            items = ((slot, getattr(self, slot)) for slot in type(self).__slots__)
         return '%s(%s)' % (
             type(self).__name__,
-            ', '.join("%s='%s'" % item for item in vars(self).items())
+            ', '.join("%s='%s'" % item for item in items)
         )
     cls.__str__ = __str__
     return cls
 
 
+class Record:
+    # Parsers fill the growable lists of a record, freeze() then turns them into tuples of interned ids and refuses any
+    # further assignment. Ids repeat across thousands of records, so interning them and dropping the per-instance
+    # __dict__ keeps large crawls small.
+    __slots__ = ("_frozen",)
+
+    def __setattr__(self, name, value):
+        if getattr(self, "_frozen", False):
+            raise AttributeError("%s '%s' is frozen, cannot set %s" % (type(self).__name__, self.id, name))
+        object.__setattr__(self, name, value)
+
+    def __setstate__(self, state):
+        # pickle restores the slots one by one through __setattr__, _frozen may come before the others
+        for name, value in state[1].items():
+            object.__setattr__(self, name, value)
+
+    def freeze(self):
+        for slot in type(self).__slots__:
+            value = getattr(self, slot)
+            if slot == "id":
+                setattr(self, slot, sys.intern(value))
+            elif type(value) == list:
+                setattr(self, slot, tuple(sys.intern(v) if type(v) == str else v for v in value))
+        self._frozen = True
+        return self
+
+    def to_obj(self) -> dict:
+        return {slot: list(getattr(self, slot)) if type(getattr(self, slot)) in (list, tuple) else getattr(self, slot)
+                for slot in type(self).__slots__}
+
+
 @auto_str
-class Track:
+class Track(Record):
+    __slots__ = ("id", "name", "artists", "labels", "duration", "tracklists", "remixes", "remix_of", "mashups",
+                 "mashup_tracks", "medialinks")
+
     def __init__(self):
         self.id = ""
         self.name = ""
@@ -24,7 +63,7 @@ class Track:
         self.remix_of = []
         self.mashups = []
         self.mashup_tracks = []  # contains the tracks that this mashup uses
-        self.medialinks = []
+        self.medialinks = []  # (type, link) tuples
 
     def add_tracklist(self, tracklistid: str):
         self.tracklists.append(tracklistid)
@@ -48,18 +87,28 @@ class Track:
         self.mashup_tracks.append(trackid)
 
     def add_medialink(self, medialink):
-        self.medialinks.append(medialink)
+        self.medialinks.append((medialink.kind, str(medialink)))
+
+    def to_obj(self) -> dict:
+        obj = super().to_obj()
+        obj["medialinks"] = [{"type": kind, "link": link} for kind, link in self.medialinks]
+        return obj
 
 
 @auto_str
-class Label:
+class Label(Record):
+    __slots__ = ("id", "name")
+
     def __init__(self):
         self.id = ""
         self.name = ""
 
 
 @auto_str
-class Artist:
+class Artist(Record):
+    __slots__ = ("id", "name", "tracks", "mashups", "members", "partOf", "remixes", "aliases", "renamed_to",
+                 "tracks_featured", "tracks_presented")
+
     def __init__(self):
         self.id = ""
         self.name = ""
@@ -69,6 +118,7 @@ class Artist:
         self.partOf = []
         self.remixes = []
         self.aliases = []
+        self.renamed_to = []
         self.tracks_featured = []
         self.tracks_presented = []
 
@@ -96,8 +146,13 @@ class Artist:
     def add_alias(self, aliasid):
         self.aliases.append(aliasid)
 
+    def add_renamed_to(self, artistid):
+        self.renamed_to.append(artistid)
+
 @auto_str
-class Tracklist:
+class Tracklist(Record):
+    __slots__ = ("id", "name", "tracks")
+
     def __init__(self):
         self.id = ""
         self.name = ""
@@ -107,52 +162,89 @@ class Tracklist:
         self.tracks.append(trackid)
 
 
+# edge lists of the records as exported, with the kind of entity they point to
+TRACK_EDGES = {"artists": "artist", "labels": "label", "tracklists": "tracklist", "remixes": "track",
+               "remix_of": "track", "mashups": "track", "mashup_tracks": "track"}
+ARTIST_EDGES = {"tracks": "track", "mashups": "track", "members": "artist", "partOf": "artist", "remixes": "track",
+                "aliases": "artist", "renamed_to": "artist", "tracks_featured": "track", "tracks_presented": "track"}
+LABEL_EDGES = {}
+TRACKLIST_EDGES = {"tracks": "track"}
+
+# kind -> (result file, edge lists)
+RESULT_FILES = {
+    "artist": ("artists.txt", ARTIST_EDGES),
+    "label": ("labels.txt", LABEL_EDGES),
+    "track": ("tracks.txt", TRACK_EDGES),
+    "tracklist": ("tracklists.txt", TRACKLIST_EDGES)
+}
+
+
+@auto_str
+class TrackCandidate:
+    def __init__(self, trackid: str, name: str, score: float = 0.0):
+        self.id = trackid
+        self.name = name
+        self.score = score
+
+
+@auto_str
+class TrackMatch:
+    def __init__(self, query: str, normalized: str):
+        self.query = query
+        self.normalized = normalized
+        self.candidates = []
+
+    def best(self):
+        return self.candidates[0] if self.candidates else None
+
+
 class Medialink(ABC):
-    @abstractmethod
+    kind = None
+
     def get_obj(self):
+        return {"type": self.kind, "link": str(self)}
+
+    @abstractmethod
+    def __str__(self):
         raise NotImplementedError()
 
 
 class YoutubeMedialink(Medialink):
+    kind = "youtube"
+
     def __init__(self, ytid: str):
         self.ytid = ytid
 
-    def get_obj(self):
-        return {"type": "youtube", "link": str(self)}
-
     def __str__(self):
         return "http://youtube.com/video/" + self.ytid
 
 
 class SpotifyMedialink(Medialink):
+    kind = "spotify"
+
     def __init__(self, spid: str):
         self.spid = spid
 
-    def get_obj(self):
-        return {"type": "spotify", "link": str(self)}
-
     def __str__(self):
         return "http://open.spotify.com/track/" + self.spid
 
 
 class SoundcloudMedialink(Medialink):
+    kind = "soundcloud"
+
     def __init__(self, link):
         self.link = link
 
-    def get_obj(self):
-        return {"type": "soundcloud", "link": str(self)}
-
     def __str__(self):
         return self.link
 
 
 class BeatportMedialink(Medialink):
+    kind = "beatport"
+
     def __init__(self, bpid):
         self.bpid = bpid
 
-    def get_obj(self):
-        return {"type": "beatport", "link": str(self)}
-
     def __str__(self):
         return "https://embed.beatport.com/player/?id=" + self.bpid + "&type=track"
 
@@ -0,0 +1,134 @@
+import heapq
+import json
+import logging
+import os
+import random
+import time
+
+from requests.exceptions import RequestException
+
+# bs.select(...)[0] and friends on a page that does not look like we expect
+PARSE_ERRORS = (IndexError, KeyError, TypeError, AttributeError, ValueError)
+# no answer from the site, which says nothing about the id itself
+CONNECTION_ERRORS = (RequestException, ConnectionError)
+RETRYABLE_ERRORS = CONNECTION_ERRORS + PARSE_ERRORS
+
+CONSECUTIVE_CONNECTION_ERRORS = 10
+OUTAGE_PAUSE = 5 * 60.0
+
+# why a fetch failed, as reported by distributed workers
+NOT_FOUND = "not found"
+PARSE_FAILURE = "parse"
+CONNECTION_FAILURE = "connection"
+
+
+class FailureLedger:
+    # Append-only record of ids that are known to be bad (404 or pages that keep failing to parse), they are never
+    # fetched again.
+
+    def __init__(self, filename: str):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.logger.setLevel("INFO")
+        self.logger.addHandler(logging.StreamHandler())
+        self.failed = set()
+
+        if os.path.isfile(filename):
+            with open(filename) as file:
+                for line in file:
+                    obj = json.loads(line)
+                    self.failed.add((obj["type"], obj["id"]))
+        self.file = open(filename, "a")
+
+        self.logger.debug("Loaded %d failed ids" % len(self.failed))
+
+    def __del__(self):
+        self.file.close()
+
+    def __len__(self):
+        return len(self.failed)
+
+    def has_failed(self, entity_type: str, entityid: str) -> bool:
+        return (entity_type, entityid) in self.failed
+
+    def record(self, entity_type: str, entityid: str, reason: str):
+        if self.has_failed(entity_type, entityid):
+            return
+        self.logger.warning("Giving up on %s '%s': %s", entity_type, entityid, reason)
+        self.failed.add((entity_type, entityid))
+        self.file.write(json.dumps({"type": entity_type, "id": entityid, "reason": reason}) + "\n")
+
+    def flush(self):
+        self.file.flush()
+
+
+class RetryQueue:
+    # Ids whose fetch failed for a transient reason, due again after an exponential, jittered backoff.
+
+    def __init__(self, max_attempts=5, base_delay=60.0, max_delay=4 * 60 * 60.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.attempts = {}
+        self.heap = []
+        self.waiting = set()
+
+    def __len__(self):
+        return len(self.heap)
+
+    def __contains__(self, key):
+        # (entity type, id) waits for its backoff, it must not be fetched before
+        return key in self.waiting
+
+    def failed(self, entity_type: str, entityid: str, give_up=True) -> bool:
+        # False once the id ran out of attempts, ids that must not give up keep retrying at the longest delay
+        key = (entity_type, entityid)
+        if key in self.waiting:
+            return True
+        attempts = self.attempts.get(key, 0) + 1
+        if attempts >= self.max_attempts and give_up:
+            self.attempts.pop(key, None)
+            return False
+        self.attempts[key] = attempts
+        delay = min(self.base_delay * 2 ** (min(attempts, self.max_attempts) - 1), self.max_delay)
+        heapq.heappush(self.heap, (time.time() + delay * random.uniform(0.75, 1.25), entity_type, entityid))
+        self.waiting.add(key)
+        return True
+
+    def attempts_of(self, entity_type: str, entityid: str) -> int:
+        return self.attempts.get((entity_type, entityid), 0)
+
+    def succeeded(self, entity_type: str, entityid: str):
+        self.attempts.pop((entity_type, entityid), None)
+
+    def pop_due(self):
+        if self.heap and self.heap[0][0] <= time.time():
+            _, entity_type, entityid = heapq.heappop(self.heap)
+            self.waiting.discard((entity_type, entityid))
+            return entity_type, entityid
+        return None
+
+    def pending(self) -> list:
+        return [(entity_type, entityid) for _, entity_type, entityid in self.heap]
+
+
+class OutageDetector:
+    # Counts connection errors in a row. Once there are too many, the network or the site is down and the crawl should
+    # pause instead of cycling through the whole frontier.
+
+    def __init__(self, max_consecutive=CONSECUTIVE_CONNECTION_ERRORS, pause=OUTAGE_PAUSE):
+        self.max_consecutive = max_consecutive
+        self.pause = pause
+        self.consecutive = 0
+
+    def failed(self):
+        self.consecutive += 1
+
+    def succeeded(self):
+        self.consecutive = 0
+
+    def is_down(self) -> bool:
+        return self.consecutive >= self.max_consecutive
+
+    def probe(self):
+        # after a pause one more fetch is allowed, it either resumes the crawl or pauses it again
+        self.consecutive = self.max_consecutive - 1
@@ -0,0 +1,20 @@
+import signal
+import time
+
+
+class GracefulKiller:
+    kill_now = False
+
+    def __init__(self):
+        signal.signal(signal.SIGINT, self.exit_gracefully)
+        signal.signal(signal.SIGTERM, self.exit_gracefully)
+
+    def exit_gracefully(self, signum, frame):
+        print("Stopping now...")
+        self.kill_now = True
+
+    def sleep(self, seconds: float, step: float = 1.0):
+        # like time.sleep, but returns early once a signal asked us to stop
+        end = time.time() + seconds
+        while not self.kill_now and time.time() < end:
+            time.sleep(min(step, max(end - time.time(), 0)))
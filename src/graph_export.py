@@ -0,0 +1,89 @@
+import csv
+import logging
+import os
+import re
+import tempfile
+
+import isodate
+
+from domain import RESULT_FILES
+from maintenance import IdSet, last_copies
+
+
+def _relationship_type(field: str) -> str:
+    return re.sub(r"(?<!^)(?=[A-Z])", "_", field).upper()
+
+
+class GraphImportExporter:
+    # Writes node and relationship CSVs in the layout of the neo4j-admin bulk importer while streaming the result
+    # files. Every kind has its own id space (e.g. :ID(Track)). Ids that are referenced but were not crawled yet are
+    # noted in a scratch file and written as nodes without properties at the end, unless their record showed up later.
+    # Of records that were crawled more than once only the last copy and its edges are exported. That takes two passes
+    # over each result file, one to find the records with several copies and one to write: streaming a file once can
+    # only keep the first copy, the older and possibly outdated one.
+
+    def __init__(self, folder: str):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.logger.setLevel("INFO")
+        self.logger.addHandler(logging.StreamHandler())
+        self.folder = folder
+        self.crawled = {kind: IdSet() for kind in RESULT_FILES}
+        self.referenced = {kind: IdSet() for kind in RESULT_FILES}
+
+    def export(self, outfolder: str):
+        os.makedirs(outfolder, exist_ok=True)
+        files = []
+        nodes = {}
+        relationships = {}
+        try:
+            for kind, (_, edges) in RESULT_FILES.items():
+                file = open(os.path.join(outfolder, kind + "s.csv"), "w", newline="", encoding="utf8")
+                files.append(file)
+                nodes[kind] = csv.writer(file)
+                header = ["id:ID(%s)" % kind.capitalize(), "name"]
+                if kind == "track":
+                    header += ["duration:float", "medialinks:string[]"]
+                nodes[kind].writerow(header + [":LABEL"])
+                for field, target in edges.items():
+                    file = open(os.path.join(outfolder, kind + "_" + field + ".csv"), "w", newline="",
+                                encoding="utf8")
+                    files.append(file)
+                    relationships[(kind, field)] = csv.writer(file)
+                    relationships[(kind, field)].writerow([":START_ID(%s)" % kind.capitalize(),
+                                                           ":END_ID(%s)" % target.capitalize(), ":TYPE"])
+
+            with tempfile.TemporaryFile("w+", encoding="utf8") as referenced:
+                for kind, (filename, edges) in RESULT_FILES.items():
+                    for obj in last_copies(os.path.join(self.folder, filename), self.crawled[kind]):
+                        self._write_record(kind, edges, obj, nodes, relationships, referenced)
+
+                referenced.seek(0)
+                stubs = 0
+                for line in referenced:
+                    kind, entityid = line.rstrip("\n").split("\t", 1)
+                    if entityid not in self.crawled[kind]:
+                        nodes[kind].writerow([entityid, ""] + (["", ""] if kind == "track" else [])
+                                             + [kind.capitalize()])
+                        stubs += 1
+        finally:
+            for file in files:
+                file.close()
+
+        self.logger.info("Exported %s crawled nodes and %d referenced-only nodes",
+                         {kind: len(ids) for kind, ids in self.crawled.items()}, stubs)
+
+    def _write_record(self, kind: str, edges: dict, obj: dict, nodes: dict, relationships: dict, referenced):
+        row = [obj["id"], obj["name"]]
+        if kind == "track":
+            duration = obj.get("duration", -1)
+            row.append(isodate.parse_duration(duration).total_seconds() if duration != -1 else "")
+            row.append(";".join(m["link"] for m in obj.get("medialinks", [])))
+        nodes[kind].writerow(row + [kind.capitalize()])
+
+        for field, target in edges.items():
+            reltype = _relationship_type(field)
+            for targetid in obj.get(field, []):
+                relationships[(kind, field)].writerow([obj["id"], targetid, reltype])
+                if targetid not in self.crawled[target] and targetid not in self.referenced[target]:
+                    self.referenced[target].add(targetid)
+                    referenced.write(target + "\t" + targetid + "\n")
@@ -0,0 +1,124 @@
+import argparse
+import logging
+import multiprocessing
+import os
+import time
+
+from canonical import ArtistCanonicalizer
+from distributed import CrawlCoordinator, CrawlWorker, serve_coordinator, connect_coordinator
+from failures import FailureLedger, RetryQueue
+from graceful import GracefulKiller
+from storage import TrackingMissingMusicStorage, FileSystemMusicStorage
+from tl1001 import TLBackend, BASEURL
+from transport import http2_session
+
+SCRAPE_TIMEOUT = 5.5
+START_TRACKLIST = "tcblybt"
+CHECKPOINT_INTERVAL = 60
+SHUTDOWN_TIMEOUT = 30
+
+
+def parse_address(address: str):
+    host, port = address.rsplit(":", 1)
+    return host, int(port)
+
+
+def run_coordinator(args):
+    logger = logging.getLogger("coordinator")
+    logger.addHandler(logging.StreamHandler())
+    logger.setLevel("INFO")
+    logger.info("Using data folder: " + args.data)
+
+    todofile = args.data + "/todo.json"
+    canonicalfile = args.data + "/canonical.json"
+
+    canonicalizer = ArtistCanonicalizer()
+    if os.path.isfile(canonicalfile):
+        canonicalizer.import_groups(canonicalfile)
+
+    ledger = FailureLedger(args.data + "/failed.txt")
+    retries = RetryQueue()
+
+    realmusicstore = FileSystemMusicStorage(args.data, append=True)
+    musicstore = TrackingMissingMusicStorage(realmusicstore, canonicalizer, ledger, retries)
+    if os.path.isfile(todofile):
+        musicstore.import_todolist(todofile)
+    else:
+        musicstore.todo_tracklists.add(START_TRACKLIST)
+
+    coordinator = CrawlCoordinator(musicstore, num_shards=args.shards, batch_size=args.batch_size,
+                                   lease_timeout=args.lease_timeout, ledger=ledger, retries=retries)
+    serve_coordinator(coordinator, parse_address(args.address), args.authkey.encode("utf8"))
+    logger.info("Coordinator listening on %s", args.address)
+
+    # spawn instead of fork, the server thread may hold locks that a forked child would inherit
+    context = multiprocessing.get_context("spawn")
+    processes = []
+    for i in range(args.workers):
+        p = context.Process(target=run_worker, args=(args, "local-%d" % i))
+        p.start()
+        processes.append(p)
+
+    killer = GracefulKiller()
+    last_checkpoint = time.time()
+    try:
+        while not killer.kill_now:
+            time.sleep(1)
+            coordinator.expire_leases()
+            if time.time() - last_checkpoint > CHECKPOINT_INTERVAL:
+                with coordinator.lock:
+                    realmusicstore.flush()
+                    ledger.flush()
+                    musicstore.export_todolist(todofile)
+                    canonicalizer.export_groups(canonicalfile)
+                logger.info("Frontier: %s", coordinator.stats())
+                last_checkpoint = time.time()
+    finally:
+        # workers return their lease once they notice the signal, the ones that do not in time are killed, their
+        # leased ids are still in the frontier
+        for p in processes:
+            p.terminate()
+        deadline = time.time() + SHUTDOWN_TIMEOUT
+        for p in processes:
+            p.join(max(deadline - time.time(), 0))
+            if p.is_alive():
+                logger.warning("Worker %s did not stop in time, killing it", p.name)
+                p.kill()
+                p.join()
+        coordinator.requeue_pending()
+        with coordinator.lock:
+            realmusicstore.flush()
+            ledger.flush()
+            musicstore.export_todolist(todofile)
+            canonicalizer.export_groups(canonicalfile)
+
+
+def run_worker(args, name=None):
+    coordinator = connect_coordinator(parse_address(args.address), args.authkey.encode("utf8"))
+    backend = TLBackend(args.baseurl, session=http2_session(args.baseurl) if args.http2 else None)
+    worker = CrawlWorker(coordinator, backend, name or "%s-%d" % (os.uname().nodename, os.getpid()),
+                         scrape_timeout=args.scrape_timeout)
+    worker.run()
+    if args.http2:
+        worker.logger.info("Transferred: %s", backend.session.stats.summary())
+
+
+parser = argparse.ArgumentParser(description="Distributed crawl of 1001tracklists")
+parser.add_argument("mode", choices=["coordinator", "worker"])
+parser.add_argument("--address", default="127.0.0.1:50001", help="host:port of the coordinator")
+parser.add_argument("--authkey", default="1001tl")
+parser.add_argument("--data", default="../results", help="data folder (coordinator only)")
+parser.add_argument("--workers", type=int, default=0, help="local worker processes to start next to the coordinator")
+parser.add_argument("--shards", type=int, default=16)
+parser.add_argument("--batch-size", type=int, default=10)
+parser.add_argument("--lease-timeout", type=float, default=600.0)
+parser.add_argument("--scrape-timeout", type=float, default=SCRAPE_TIMEOUT)
+parser.add_argument("--baseurl", default=BASEURL, help="site to crawl, e.g. a local stand-in server")
+parser.add_argument("--http2", action="store_true", help="fetch over HTTP/2 with compressed transfer (needs httpx)")
+
+if __name__ == "__main__":
+    arguments = parser.parse_args()
+    if arguments.mode == "coordinator":
+        run_coordinator(arguments)
+    else:
+        run_worker(arguments)
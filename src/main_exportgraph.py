@@ -0,0 +1,6 @@
+from graph_export import GraphImportExporter
+
+datafolder = "../results"
+exporter = GraphImportExporter(datafolder)
+
+exporter.export(datafolder + "/graph")
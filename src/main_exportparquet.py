@@ -0,0 +1,6 @@
+from parquet_export import ParquetExporter
+
+datafolder = "../results"
+exporter = ParquetExporter(datafolder)
+
+exporter.export(datafolder + "/parquet")
@@ -0,0 +1,46 @@
+import argparse
+import json
+
+from crawler import open_musicstore, close_musicstore
+from resolver import TrackNameResolver
+from tl1001 import BASEURL
+
+SCRAPE_TIMEOUT = 5.5
+
+
+def resolve_playlist(args):
+    with open(args.playlist, encoding="utf8") as file:
+        names = [line.strip() for line in file if line.strip()]
+
+    resolver = TrackNameResolver(args.cache, workers=args.workers, interval=args.interval, baseurl=args.baseurl,
+                                 http2=args.http2)
+    matches = resolver.resolve(names)
+
+    with open(args.output, "w", encoding="utf8") as file:
+        for match in matches:
+            file.write(json.dumps({
+                "query": match.query,
+                "candidates": [{"id": c.id, "name": c.name, "score": round(c.score, 3)} for c in match.candidates]
+            }) + "\n")
+
+    if args.seed:
+        # the crawl picks the best matches up from its todo list, crawled and failed tracks are not queued again
+        musicstore = open_musicstore(args.seed)
+        musicstore.add_todo("track", [m.best().id for m in matches
+                                      if m.best() is not None and m.best().score >= args.min_score])
+        close_musicstore(musicstore, args.seed)
+
+
+parser = argparse.ArgumentParser(description="Resolve track names to 1001tracklists track ids")
+parser.add_argument("playlist", help="text file with one track name per line")
+parser.add_argument("--output", default="../results/resolved.txt")
+parser.add_argument("--cache", default="../results/search_cache.txt")
+parser.add_argument("--workers", type=int, default=4)
+parser.add_argument("--interval", type=float, default=SCRAPE_TIMEOUT, help="seconds between two searches")
+parser.add_argument("--seed", help="data folder of the crawl to add the best matches to")
+parser.add_argument("--min-score", type=float, default=0.6, help="minimum score of a match used for seeding")
+parser.add_argument("--baseurl", default=BASEURL)
+parser.add_argument("--http2", action="store_true", help="search over one shared HTTP/2 connection (needs httpx)")
+
+if __name__ == "__main__":
+    resolve_playlist(parser.parse_args())
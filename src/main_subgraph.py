@@ -0,0 +1,39 @@
+import argparse
+
+from domain import RESULT_FILES
+from subgraph import AdjacencyIndex, SubgraphExtractor
+
+
+def parse_seed(seed: str):
+    kind, entityid = seed.split(":", 1)
+    if kind not in RESULT_FILES:
+        raise argparse.ArgumentTypeError("unknown kind '%s', use one of %s" % (kind, ", ".join(RESULT_FILES)))
+    return kind, entityid
+
+
+def extract_subgraph(args):
+    index = AdjacencyIndex(args.data)
+    if args.rebuild:
+        index.build()
+    else:
+        index.update()
+
+    extractor = SubgraphExtractor(index)
+    nodes = extractor.extract(args.seeds, args.hops)
+    if args.format == "ttl":
+        extractor.write_ttl(nodes, args.output)
+    else:
+        extractor.write_jsonl(nodes, args.output)
+    print("Wrote %d entities within %d hops to %s" % (len(nodes), args.hops, args.output))
+
+
+parser = argparse.ArgumentParser(description="Extract the neighbourhood of some entities from the scraped data")
+parser.add_argument("seeds", nargs="+", type=parse_seed, help="kind:id, e.g. tracklist:tcblybt")
+parser.add_argument("--hops", type=int, default=3)
+parser.add_argument("--format", choices=["jsonl", "ttl"], default="jsonl")
+parser.add_argument("--output", default="../results/subgraph.txt")
+parser.add_argument("--data", default="../results")
+parser.add_argument("--rebuild", action="store_true", help="index the result files from the start instead of only the records added since")
+
+if __name__ == "__main__":
+    extract_subgraph(parser.parse_args())
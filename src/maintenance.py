@@ -0,0 +1,148 @@
+import hashlib
+import json
+import os
+from array import array
+
+from domain import RESULT_FILES
+
+# Only the standard library in here: these commands should start instantly, also on machines without the crawl
+# dependencies. Never run them while a crawl appends to the same folder.
+
+
+class IdSet:
+    # Open addressing hash set of 64 bit id digests in one array('Q'), 12 to 24 bytes per id instead of about 84 for a
+    # set of short id strings. Digest collisions are negligible for the few million ids of a crawl.
+
+    def __init__(self, capacity: int = 1 << 16):
+        self.table = array("Q", bytes(8 * capacity))
+        self.size = 0
+
+    @staticmethod
+    def _digest(entityid: str) -> int:
+        # 0 marks an empty slot
+        return int.from_bytes(hashlib.blake2b(entityid.encode("utf8"), digest_size=8).digest(), "little") or 1
+
+    def _slot(self, digest: int) -> int:
+        mask = len(self.table) - 1
+        i = digest & mask
+        while self.table[i] != 0 and self.table[i] != digest:
+            i = (i + 1) & mask
+        return i
+
+    def __contains__(self, entityid: str):
+        digest = self._digest(entityid)
+        return self.table[self._slot(digest)] == digest
+
+    def __len__(self):
+        return self.size
+
+    def add(self, entityid: str):
+        digest = self._digest(entityid)
+        i = self._slot(digest)
+        if self.table[i] == digest:
+            return
+        self.table[i] = digest
+        self.size += 1
+        if 3 * self.size > 2 * len(self.table):
+            old = self.table
+            self.table = array("Q", bytes(16 * len(old)))
+            for digest in old:
+                if digest != 0:
+                    self.table[self._slot(digest)] = digest
+
+
+def count_lines(filename: str) -> int:
+    with open(filename, "rb") as file:
+        return sum(chunk.count(b"\n") for chunk in iter(lambda: file.read(1 << 20), b""))
+
+
+def stats(folder: str) -> dict:
+    obj = {}
+    for kind, (filename, _) in RESULT_FILES.items():
+        path = os.path.join(folder, filename)
+        if os.path.isfile(path):
+            obj[kind + "s"] = {"records": count_lines(path), "bytes": os.path.getsize(path)}
+    todofile = os.path.join(folder, "todo.json")
+    if os.path.isfile(todofile):
+        with open(todofile) as file:
+            obj["todo"] = {kind: len(ids) for kind, ids in json.load(file).items()}
+    failedfile = os.path.join(folder, "failed.txt")
+    if os.path.isfile(failedfile):
+        obj["failed"] = count_lines(failedfile)
+    return obj
+
+
+def last_copies(filename: str, seen=None):
+    # Yields the records of a result file in file order, but of records that were crawled more than once only the last
+    # copy, like compact() keeps it. A first pass puts every id into seen and counts the copies of the few ids that
+    # occur more than once.
+    seen = seen if seen is not None else IdSet()
+    copies = {}
+    with open(filename, "rb") as file:
+        for line in file:
+            entityid = json.loads(line)["id"]
+            if entityid in seen:
+                copies[entityid] = copies.get(entityid, 1) + 1
+            else:
+                seen.add(entityid)
+    with open(filename, "rb") as file:
+        for line in file:
+            obj = json.loads(line)
+            if obj["id"] in copies:
+                copies[obj["id"]] -= 1
+                if copies[obj["id"]] > 0:
+                    continue
+            yield obj
+
+
+def _rewrite(filename: str, keep):
+    # keep(lineno, line) decides per line, the file is replaced atomically once it is written
+    tmpfile = filename + ".compact"
+    kept = 0
+    with open(filename, "rb") as infile, open(tmpfile, "wb") as outfile:
+        for lineno, line in enumerate(infile):
+            if keep(lineno, line):
+                outfile.write(line)
+                kept += 1
+    os.replace(tmpfile, filename)
+    return kept
+
+
+def compact(folder: str) -> dict:
+    # Drops all but the last copy of records that were crawled more than once, duplicate failure entries and todo ids
+    # that are crawled or known to fail.
+    obj = {}
+    crawled = {}
+    for kind, (filename, _) in RESULT_FILES.items():
+        path = os.path.join(folder, filename)
+        last = {}
+        with open(path, "rb") as file:
+            for lineno, line in enumerate(file):
+                last[json.loads(line)["id"]] = lineno
+        lines = set(last.values())
+        kept = _rewrite(path, lambda lineno, line: lineno in lines)
+        obj[kind + "s"] = kept
+        crawled[kind] = set(last)
+
+    failed = {kind: set() for kind in RESULT_FILES}
+    failedfile = os.path.join(folder, "failed.txt")
+    if os.path.isfile(failedfile):
+        def first_failure(lineno, line):
+            entry = json.loads(line)
+            if entry["id"] in failed[entry["type"]]:
+                return False
+            failed[entry["type"]].add(entry["id"])
+            return True
+        obj["failed"] = _rewrite(failedfile, first_failure)
+
+    todofile = os.path.join(folder, "todo.json")
+    if os.path.isfile(todofile):
+        with open(todofile) as file:
+            todos = json.load(file)
+        for kind in RESULT_FILES:
+            todos[kind + "s"] = [i for i in todos[kind + "s"] if i not in crawled[kind] and i not in failed[kind]]
+        with open(todofile + ".compact", "w") as file:
+            json.dump(todos, file)
+        os.replace(todofile + ".compact", todofile)
+        obj["todo"] = {kind: len(ids) for kind, ids in todos.items()}
+    return obj
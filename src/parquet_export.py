@@ -0,0 +1,100 @@
+import logging
+import os
+
+import isodate
+
+from domain import RESULT_FILES
+from maintenance import last_copies
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+
+class _TableWriter:
+    # Buffers rows column by column and hands them to the parquet writer one row group at a time.
+
+    def __init__(self, filename: str, columns: list, batch_size: int):
+        self.schema = pa.schema([(name, typ) for name, typ in columns])
+        # ids and medialink types repeat a lot, the other strings (names, links) barely do
+        dictionary_columns = [name for name, _ in columns if name.endswith("_id") or name in ("id", "type")]
+        self.writer = pq.ParquetWriter(filename, self.schema, compression="zstd", use_dictionary=dictionary_columns)
+        self.batch_size = batch_size
+        self.columns = {name: [] for name, _ in columns}
+        self.rows = 0
+
+    def append(self, *row):
+        for column, value in zip(self.columns.values(), row):
+            column.append(value)
+        self.rows += 1
+        if len(self.columns[self.schema.names[0]]) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.columns[self.schema.names[0]]:
+            self.writer.write_table(pa.table(self.columns, schema=self.schema))
+            for column in self.columns.values():
+                column.clear()
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+
+class ParquetExporter:
+    # Streams the result files into one zstd compressed parquet node table per kind (tracks, artists, labels,
+    # tracklists) and one edge table per edge list (e.g. track_artists, track_remixes, artist_members) with the columns
+    # src_id and dst_id. Medialinks go to track_medialinks (src_id, type, link). Of records that were crawled more than
+    # once only the last copy is exported. Memory is not bounded by batch_size alone: while a file is exported, the ids
+    # of all its records are kept in an IdSet (12 to 24 bytes per id) plus a counter per id that occurs more than once,
+    # which is none after `cli.py compact`.
+
+    def __init__(self, folder: str, batch_size: int = 65536):
+        if pa is None:
+            raise ImportError("ParquetExporter needs pyarrow, install it with 'pip3 install pyarrow'")
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.logger.setLevel("INFO")
+        self.logger.addHandler(logging.StreamHandler())
+        self.folder = folder
+        self.batch_size = batch_size
+
+    def _writer(self, outfolder: str, table: str, columns: list) -> _TableWriter:
+        return _TableWriter(os.path.join(outfolder, table + ".parquet"), columns, self.batch_size)
+
+    def export(self, outfolder: str):
+        os.makedirs(outfolder, exist_ok=True)
+        for kind, (filename, edges) in RESULT_FILES.items():
+            columns = [("id", pa.string()), ("name", pa.string())]
+            if kind == "track":
+                columns.append(("duration_seconds", pa.float64()))
+            writers = {"nodes": self._writer(outfolder, kind + "s", columns)}
+            for field in edges:
+                writers[field] = self._writer(outfolder, kind + "_" + field,
+                                              [("src_id", pa.string()), ("dst_id", pa.string())])
+            if kind == "track":
+                writers["medialinks"] = self._writer(outfolder, "track_medialinks",
+                                                     [("src_id", pa.string()), ("type", pa.string()),
+                                                      ("link", pa.string())])
+            try:
+                for obj in last_copies(os.path.join(self.folder, filename)):
+                    self._write_record(kind, edges, obj, writers)
+            finally:
+                for writer in writers.values():
+                    writer.close()
+            self.logger.info("Exported %d %ss", writers["nodes"].rows, kind)
+
+    def _write_record(self, kind: str, edges: dict, obj: dict, writers: dict):
+        if kind == "track":
+            duration = obj.get("duration", -1)
+            seconds = isodate.parse_duration(duration).total_seconds() if duration != -1 else None
+            writers["nodes"].append(obj["id"], obj["name"], seconds)
+            for medialink in obj.get("medialinks", []):
+                writers["medialinks"].append(obj["id"], medialink["type"], medialink["link"])
+        else:
+            writers["nodes"].append(obj["id"], obj["name"])
+        for field in edges:
+            for target in obj.get(field, []):
+                writers[field].append(obj["id"], target)
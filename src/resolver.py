@@ -0,0 +1,124 @@
+import difflib
+import json
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+
+from domain import RateLimitException, TrackCandidate, TrackMatch
+from failures import RETRYABLE_ERRORS
+from tl1001 import TLBackend, BASEURL
+from transport import http2_session
+
+
+def normalize_trackname(name: str) -> str:
+    name = unicodedata.normalize("NFKD", name)
+    name = "".join(c for c in name if not unicodedata.combining(c)).lower()
+    name = re.sub(r"\b(featuring|feat|ft)\b\.?", " ft ", name)
+    name = re.sub(r"[(\[]\s*original mix\s*[)\]]", " ", name)
+    name = re.sub(r"[^\w()\[\]]+", " ", name)
+    return re.sub(r"\s+", " ", name).strip()
+
+
+class RateLimiter:
+    # Spaces out the start of requests by at least `interval` seconds, no matter how many threads ask for a slot.
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.next_slot = 0.0
+
+    def wait(self):
+        with self.lock:
+            now = time.time()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        time.sleep(slot - now)
+
+
+class SearchCache:
+    # Raw search results by normalized query, appended to a JSONL file so a rerun never repeats a search.
+
+    def __init__(self, filename: str):
+        self.lock = threading.Lock()
+        self.results = {}
+        if os.path.isfile(filename):
+            with open(filename) as file:
+                for line in file:
+                    obj = json.loads(line)
+                    self.results[obj["query"]] = obj["candidates"]
+        self.file = open(filename, "a")
+
+    def __del__(self):
+        self.file.close()
+
+    def __contains__(self, query: str):
+        return query in self.results
+
+    def get(self, query: str) -> list:
+        return [TrackCandidate(trackid, name) for trackid, name in self.results[query]]
+
+    def put(self, query: str, candidates: list):
+        obj = [[c.id, c.name] for c in candidates]
+        with self.lock:
+            self.results[query] = obj
+            self.file.write(json.dumps({"query": query, "candidates": obj}) + "\n")
+            self.file.flush()
+
+
+class TrackNameResolver:
+
+    def __init__(self, cachefile: str, workers=4, interval=5.5, max_candidates=5, baseurl=BASEURL, http2=False):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.logger.setLevel("INFO")
+        self.logger.addHandler(logging.StreamHandler())
+        self.cache = SearchCache(cachefile)
+        self.workers = workers
+        self.limiter = RateLimiter(interval)
+        self.max_candidates = max_candidates
+        self.baseurl = baseurl
+        self.local = threading.local()
+        # one HTTP/2 connection carries the searches of all threads as concurrent streams
+        self.session = http2_session(baseurl) if http2 else None
+        self.rate_limited = threading.Event()
+
+    def _backend(self) -> TLBackend:
+        # requests sessions are not thread-safe, every worker thread gets its own
+        if not hasattr(self.local, "backend"):
+            self.local.backend = TLBackend(self.baseurl, session=self.session)
+        return self.local.backend
+
+    def _search(self, query: str):
+        if self.rate_limited.is_set():
+            return
+        self.limiter.wait()
+        try:
+            self.cache.put(query, self._backend().search_track(query))
+        except RateLimitException:
+            self.logger.warning("Ran into ratelimit!!! Skipping the remaining searches")
+            self.rate_limited.set()
+        except RETRYABLE_ERRORS as e:
+            self.logger.warning("Search for '%s' failed: %r", query, e)
+
+    def _rank(self, match: TrackMatch, candidates: list):
+        for candidate in candidates:
+            candidate.score = difflib.SequenceMatcher(None, match.normalized, normalize_trackname(candidate.name)).ratio()
+        # sorted() is stable, equal scores keep the order of the search results
+        match.candidates = sorted(candidates, key=lambda c: -c.score)[:self.max_candidates]
+
+    def resolve(self, names: list) -> list:
+        matches = [TrackMatch(name, normalize_trackname(name)) for name in names]
+        queries = list(dict.fromkeys(m.normalized for m in matches if m.normalized and m.normalized not in self.cache))
+        self.logger.info("Resolving %d names, %d distinct searches are not cached", len(names), len(queries))
+
+        self.rate_limited.clear()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            list(executor.map(self._search, queries))
+
+        for match in matches:
+            if match.normalized in self.cache:
+                self._rank(match, self.cache.get(match.normalized))
+        return matches
@@ -0,0 +1,122 @@
+import gzip
+import io
+import logging
+import re
+import time
+import xml.etree.ElementTree as ET
+from collections import deque
+from urllib.parse import urljoin
+
+from storage import TrackingMissingMusicStorage
+from tl1001 import TLBackend
+
+URL_PATTERN = re.compile(r"/(track|artist|label|tracklist)/([^/]+)/")
+GZIP_MAGIC = b"\x1f\x8b"
+BATCH_SIZE = 10000
+
+
+def classify(url: str):
+    # (entity type, id) of a page url, None for pages that are no entity
+    match = URL_PATTERN.search(url)
+    return (match.group(1), match.group(2)) if match else None
+
+
+def _localname(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+class SitemapBootstrap:
+    # Walks the sitemaps of the site and puts every entity they list into the todo frontier of the musicstore, unless
+    # it is crawled or known to fail already. Sitemaps are parsed while they download, so neither a sitemap index with
+    # thousands of entries nor a sitemap with 50000 urls is ever held in memory as a whole.
+
+    def __init__(self, musicstore: TrackingMissingMusicStorage, tlb: TLBackend, scrape_timeout: float = 1.0):
+        self.musicstore = musicstore
+        self.tlb = tlb
+        self.scrape_timeout = scrape_timeout
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.logger.setLevel("INFO")
+        self.logger.addHandler(logging.StreamHandler())
+        self.seen = {"track": 0, "artist": 0, "label": 0, "tracklist": 0}
+        self.sitemaps = 0
+
+    def discover(self) -> list:
+        # sitemaps announced in robots.txt, the conventional location otherwise
+        req = self.tlb.session.get(self.tlb.baseurl + "robots.txt")
+        sitemaps = []
+        if req.status_code == 200:
+            for line in req.text.splitlines():
+                key, _, value = line.partition(":")
+                if key.strip().lower() == "sitemap" and value.strip():
+                    sitemaps.append(urljoin(self.tlb.baseurl, value.strip()))
+        return sitemaps or [self.tlb.baseurl + "sitemap.xml"]
+
+    def _open(self, url: str):
+        req = self.tlb.session.get(url, stream=True)
+        req.raise_for_status()
+        # undoes a gzip Content-Encoding, a .xml.gz file stays compressed and is recognized by its magic bytes
+        req.raw.decode_content = True
+        # otherwise the raw stream reports itself closed once the body is read, before the buffer is drained
+        req.raw.auto_close = False
+        stream = io.BufferedReader(req.raw)
+        if stream.peek(len(GZIP_MAGIC))[:len(GZIP_MAGIC)] == GZIP_MAGIC:
+            return req, gzip.GzipFile(fileobj=stream)
+        return req, stream
+
+    def _iter_locs(self, stream):
+        # yields (tag name, loc) for every <url> and <sitemap> entry and drops each entry once it is read
+        root = None
+        for event, elem in ET.iterparse(stream, events=("start", "end")):
+            if root is None:
+                root = elem
+            if event != "end":
+                continue
+            name = _localname(elem.tag)
+            if name in ("url", "sitemap"):
+                loc = next((child.text for child in elem if _localname(child.tag) == "loc"), None)
+                if loc:
+                    yield name, loc.strip()
+                elem.clear()
+                root.clear()
+
+    def _flush(self, batch: dict):
+        for entity_type, ids in batch.items():
+            self.musicstore.add_todo(entity_type, ids)
+            ids.clear()
+
+    def bootstrap(self, sitemaps: list = None):
+        queue = deque(sitemaps or self.discover())
+        visited = set()
+        batch = {entity_type: [] for entity_type in self.seen}
+        while queue:
+            url = queue.popleft()
+            if url in visited:
+                continue
+            visited.add(url)
+            self.logger.info("Reading sitemap %s", url)
+            req, stream = self._open(url)
+            try:
+                for name, loc in self._iter_locs(stream):
+                    if name == "sitemap":
+                        queue.append(urljoin(url, loc))
+                        continue
+                    entity = classify(loc)
+                    if entity is None:
+                        continue
+                    self.seen[entity[0]] += 1
+                    batch[entity[0]].append(entity[1])
+                    if len(batch[entity[0]]) >= BATCH_SIZE:
+                        self._flush(batch)
+            finally:
+                req.close()
+            self._flush(batch)
+            self.sitemaps += 1
+            if queue:
+                time.sleep(self.scrape_timeout)
+
+        self.logger.info("Read %d sitemaps listing %s", self.sitemaps, self.seen)
+        self.logger.info("TODO queue sizes: tracks=%d, artists=%d, labels=%d, tracklists=%d",
+                         len(self.musicstore.todo_tracks),
+                         len(self.musicstore.todo_artists),
+                         len(self.musicstore.todo_labels),
+                         len(self.musicstore.todo_tracklists))
@@ -0,0 +1,126 @@
+import heapq
+import json
+import logging
+import os
+import tempfile
+from itertools import groupby
+
+from domain import RESULT_FILES
+
+# Only the standard library in here, like maintenance.py. Memory is bounded by run_size records per side, the result
+# files themselves may be larger than RAM.
+
+RUN_SIZE = 100000
+
+
+def _write_run(records: dict, tmpfolder: str) -> str:
+    with tempfile.NamedTemporaryFile("w", dir=tmpfolder, suffix=".run", delete=False, encoding="utf8") as file:
+        for entityid in sorted(records):
+            lineno, line = records[entityid]
+            file.write("%s\t%d\t%s" % (entityid, lineno, line))
+        return file.name
+
+
+def _read_run(filename: str):
+    with open(filename, encoding="utf8") as file:
+        for row in file:
+            entityid, lineno, line = row.split("\t", 2)
+            yield entityid, int(lineno), line
+
+
+def sorted_records(filename: str, tmpfolder: str, run_size: int = RUN_SIZE):
+    # Yields (id, json line) in id order, only the last copy of records that were crawled more than once. The file is
+    # cut into id sorted runs of run_size records, which are merged while reading.
+    runs = []
+    if os.path.isfile(filename):
+        records = {}
+        with open(filename, encoding="utf8") as file:
+            for lineno, line in enumerate(file):
+                if not line.endswith("\n"):
+                    line += "\n"
+                records[json.loads(line)["id"]] = (lineno, line)
+                if len(records) >= run_size:
+                    runs.append(_write_run(records, tmpfolder))
+                    records = {}
+        if records:
+            runs.append(_write_run(records, tmpfolder))
+    try:
+        merged = heapq.merge(*(_read_run(run) for run in runs))
+        for entityid, copies in groupby(merged, key=lambda row: row[0]):
+            # ties are ordered by line number, so the last one is the copy that was written last
+            *_, (_, _, line) = copies
+            yield entityid, line
+    finally:
+        for run in runs:
+            os.remove(run)
+
+
+def diff_fields(old: dict, new: dict, edges: dict) -> dict:
+    # edge lists report the ids they gained and lost, every other field its old and new value
+    fields = {}
+    for field in list(old) + [f for f in new if f not in old]:
+        before, after = old.get(field), new.get(field)
+        if before == after:
+            continue
+        if field in edges:
+            before, after = before or [], after or []
+            beforeset, afterset = set(before), set(after)
+            added = [i for i in after if i not in beforeset]
+            removed = [i for i in before if i not in afterset]
+            if added or removed:
+                fields[field] = {"added": added, "removed": removed}
+        else:
+            fields[field] = {"old": before, "new": after}
+    return fields
+
+
+class SnapshotDiff:
+    # Compares two result folders, e.g. copies taken before and after a crawl session, and writes a JSONL changelog
+    # with one line per added, removed or modified record:
+    #   {"op": "add", "type": "track", "id": ..., "record": {...}}
+    #   {"op": "remove", "type": "track", "id": ...}
+    #   {"op": "modify", "type": "track", "id": ..., "fields": {"name": {"old": ..., "new": ...},
+    #                                                            "artists": {"added": [...], "removed": [...]}}}
+    # Both sides are read as id sorted streams and joined like in a merge sort.
+
+    def __init__(self, oldfolder: str, newfolder: str, run_size: int = RUN_SIZE, tmpfolder: str = None):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.logger.setLevel("INFO")
+        self.logger.addHandler(logging.StreamHandler())
+        self.oldfolder = oldfolder
+        self.newfolder = newfolder
+        self.run_size = run_size
+        self.tmpfolder = tmpfolder
+
+    def _changes(self, kind: str, edges: dict, old, new):
+        done = object()
+        oldid, oldline = next(old, (done, None))
+        newid, newline = next(new, (done, None))
+        while oldid is not done or newid is not done:
+            if newid is done or (oldid is not done and oldid < newid):
+                yield {"op": "remove", "type": kind, "id": oldid}
+                oldid, oldline = next(old, (done, None))
+            elif oldid is done or newid < oldid:
+                yield {"op": "add", "type": kind, "id": newid, "record": json.loads(newline)}
+                newid, newline = next(new, (done, None))
+            else:
+                if oldline != newline:
+                    fields = diff_fields(json.loads(oldline), json.loads(newline), edges)
+                    if fields:
+                        yield {"op": "modify", "type": kind, "id": newid, "fields": fields}
+                oldid, oldline = next(old, (done, None))
+                newid, newline = next(new, (done, None))
+
+    def diff(self, output: str) -> dict:
+        counts = {}
+        with tempfile.TemporaryDirectory(dir=self.tmpfolder) as tmpfolder, \
+                open(output, "w", encoding="utf8") as file:
+            for kind, (filename, edges) in RESULT_FILES.items():
+                old = sorted_records(os.path.join(self.oldfolder, filename), tmpfolder, self.run_size)
+                new = sorted_records(os.path.join(self.newfolder, filename), tmpfolder, self.run_size)
+                counts[kind + "s"] = {"add": 0, "remove": 0, "modify": 0}
+                for change in self._changes(kind, edges, old, new):
+                    counts[kind + "s"][change["op"]] += 1
+                    file.write(json.dumps(change) + "\n")
+                self.logger.info("%ss: %s", kind, counts[kind + "s"])
+        return counts
@@ -1,18 +1,22 @@
 from domain import *
+from canonical import ArtistCanonicalizer
+from failures import FailureLedger, RetryQueue
 import abc
-import jsonpickle
 from datetime import timedelta
 import isodate
 import json
 import logging
+import os
 
 
-class TimeDeltaJSONHandler(jsonpickle.handlers.BaseHandler):
-    def flatten(self, obj, data):
+def _encode_value(obj):
+    if isinstance(obj, timedelta):
         return isodate.duration_isoformat(obj)
+    raise TypeError("Cannot encode %r" % obj)
 
 
-jsonpickle.handlers.registry.register(timedelta, TimeDeltaJSONHandler)
+def encode_record(record: Record) -> str:
+    return json.dumps(record.to_obj(), default=_encode_value)
 
 
 class MusicStorage(abc.ABC):
@@ -93,6 +97,12 @@ class FileSystemMusicStorage(MusicStorage):
         self.file_labels.close()
         self.file_tracklists.close()
 
+    def flush(self):
+        self.file_tracks.flush()
+        self.file_artists.flush()
+        self.file_labels.flush()
+        self.file_tracklists.flush()
+
     def has_track(self, trackid):
         return trackid in self.tracks
 
@@ -106,63 +116,120 @@ class FileSystemMusicStorage(MusicStorage):
         return tlid in self.tracklists
 
     def put_track(self, track: Track):
-        self.file_tracks.write(jsonpickle.encode(track, unpicklable=False) + "\n")
-        self.tracks.add(track)
+        self.file_tracks.write(encode_record(track) + "\n")
+        self.tracks.add(track.id)
 
     def put_artist(self, artist: Artist):
-        self.file_artists.write(jsonpickle.encode(artist, unpicklable=False) + "\n")
-        self.artists.add(artist)
+        self.file_artists.write(encode_record(artist) + "\n")
+        self.artists.add(artist.id)
 
     def put_label(self, label: Label):
-        self.file_labels.write(jsonpickle.encode(label, unpicklable=False) + "\n")
-        self.labels.add(label)
+        self.file_labels.write(encode_record(label) + "\n")
+        self.labels.add(label.id)
 
     def put_tracklist(self, tracklist: Tracklist):
-        self.file_tracklists.write(jsonpickle.encode(tracklist, unpicklable=False) + "\n")
-        self.tracks.add(tracklist)
+        self.file_tracklists.write(encode_record(tracklist) + "\n")
+        self.tracklists.add(tracklist.id)
 
 
 class TemporaryMusicStorage(MusicStorage):
+    # Keeps the records in memory. With a spill folder, the records are written to one JSONL file per kind whenever
+    # more than max_records are held and only their ids stay in memory.
 
-    def __init__(self):
+    def __init__(self, spill_folder: str = None, max_records: int = 100000):
         self.tracks = {}
         self.artists = {}
         self.labels = {}
         self.tracklists = {}
+        self.spill_folder = spill_folder
+        self.max_records = max_records
+        self.spilled = {"tracks": set(), "artists": set(), "labels": set(), "tracklists": set()}
 
     def has_track(self, trackid):
-        return trackid in self.tracks
+        return trackid in self.tracks or trackid in self.spilled["tracks"]
 
     def has_artist(self, artistid):
-        return artistid in self.artists
+        return artistid in self.artists or artistid in self.spilled["artists"]
 
     def has_label(self, labelid):
-        return labelid in self.labels
+        return labelid in self.labels or labelid in self.spilled["labels"]
 
     def has_tracklist(self, tlid):
-        return tlid in self.tracklists
+        return tlid in self.tracklists or tlid in self.spilled["tracklists"]
 
     def put_track(self, track: Track):
         self.tracks[track.id] = track
+        self._maybe_spill()
 
     def put_artist(self, artist: Artist):
         self.artists[artist.id] = artist
+        self._maybe_spill()
 
     def put_label(self, label: Label):
         self.labels[label.id] = label
+        self._maybe_spill()
 
     def put_tracklist(self, tracklist: Tracklist):
         self.tracklists[tracklist.id] = tracklist
+        self._maybe_spill()
+
+    def _maybe_spill(self):
+        if self.spill_folder is None:
+            return
+        if len(self.tracks) + len(self.artists) + len(self.labels) + len(self.tracklists) > self.max_records:
+            self.spill()
+
+    def _drop_spilled(self, filename: str, recordids):
+        with open(filename) as infile, open(filename + ".tmp", "w") as outfile:
+            for line in infile:
+                if json.loads(line)["id"] not in recordids:
+                    outfile.write(line)
+        os.replace(filename + ".tmp", filename)
+
+    def spill(self):
+        for kind in self.spilled:
+            records = getattr(self, kind)
+            filename = os.path.join(self.spill_folder, kind + ".txt")
+            if not self.spilled[kind].isdisjoint(records):
+                # records stored again after they were spilled replace their old copy
+                self._drop_spilled(filename, records)
+            with open(filename, "a") as file:
+                for record in records.values():
+                    file.write(encode_record(record) + "\n")
+            self.spilled[kind].update(records)
+            records.clear()
+
+    def iter_records(self, kind: str):
+        records = getattr(self, kind)
+        if self.spilled[kind]:
+            with open(os.path.join(self.spill_folder, kind + ".txt")) as file:
+                for line in file:
+                    obj = json.loads(line)
+                    if obj["id"] not in records:  # stored again after it was spilled
+                        yield obj["id"], line.rstrip("\n")
+        for recordid, record in records.items():
+            yield recordid, encode_record(record)
 
     def store_to_disk(self, file: str):
+        # same layout as a dump of the whole store, but written one record at a time
         with open(file, "w") as file:
-            file.write(jsonpickle.encode(self, unpicklable=False))
+            file.write("{")
+            for i, kind in enumerate(self.spilled):
+                file.write((", " if i > 0 else "") + json.dumps(kind) + ": {")
+                for j, (recordid, record) in enumerate(self.iter_records(kind)):
+                    file.write((", " if j > 0 else "") + json.dumps(recordid) + ": " + record)
+                file.write("}")
+            file.write("}")
 
 
 class TrackingMissingMusicStorage(MusicStorage):
 
-    def __init__(self, real: MusicStorage):
+    def __init__(self, real: MusicStorage, canonicalizer: ArtistCanonicalizer = None, ledger: FailureLedger = None,
+                 retries: RetryQueue = None):
         self.real = real
+        self.canonicalizer = canonicalizer
+        self.ledger = ledger
+        self.retries = retries
         self.todo_tracks = set()
         self.todo_artists = set()
         self.todo_labels = set()
@@ -184,6 +251,10 @@ class TrackingMissingMusicStorage(MusicStorage):
         self.real.put_artist(artist)
         if artist.id in self.todo_artists:
             self.todo_artists.remove(artist.id)
+        if self.canonicalizer is not None:
+            # aliases and renamed pages describe the artist we just stored, fetching them is redundant
+            self.canonicalizer.add_artist(artist)
+            self.todo_artists.difference_update(self.canonicalizer.group(artist.id))
         self._handle_artists(artist.members)
         self._handle_artists(artist.partOf)
         self._handle_tracks(artist.tracks)
@@ -215,22 +286,39 @@ class TrackingMissingMusicStorage(MusicStorage):
     def has_tracklist(self, tlid):
         return self.real.has_tracklist(tlid)
 
+    def _held_back(self, entity_type, entityid):
+        # known to fail, or failed lately and waiting for its retry
+        if self.retries is not None and (entity_type, entityid) in self.retries:
+            return True
+        return self.ledger is not None and self.ledger.has_failed(entity_type, entityid)
+
     def _handle_tracks(self, tracks):
-        for t in filter(lambda tid: not self.has_track(tid), tracks):
+        for t in filter(lambda tid: not self.has_track(tid) and not self._held_back("track", tid), tracks):
             self.todo_tracks.add(t)
 
+    def _has_canonical_artist(self, artistid):
+        if self.canonicalizer is None:
+            return self.has_artist(artistid)
+        return any(self.has_artist(aid) for aid in self.canonicalizer.group(artistid))
+
     def _handle_artists(self, artists):
-        for a in filter(lambda aid: not self.has_artist(aid), artists):
+        for a in filter(lambda aid: not self._has_canonical_artist(aid) and not self._held_back("artist", aid),
+                        artists):
             self.todo_artists.add(a)
 
     def _handle_labels(self, labels):
-        for l in filter(lambda lid: not self.has_label(lid), labels):
+        for l in filter(lambda lid: not self.has_label(lid) and not self._held_back("label", lid), labels):
             self.todo_labels.add(l)
 
     def _handle_tracklists(self, tracklists):
-        for tl in filter(lambda lid: not self.has_tracklist(lid), tracklists):
+        for tl in filter(lambda lid: not self.has_tracklist(lid) and not self._held_back("tracklist", lid),
+                         tracklists):
             self.todo_tracklists.add(tl)
 
+    def add_todo(self, entity_type, entityids):
+        # queues ids found outside of crawled pages, skipping the ones that are crawled, known to fail or waiting for a retry
+        getattr(self, "_handle_" + entity_type + "s")(entityids)
+
     def export_todolist(self, todofile):
         obj = {
             "tracks": list(self.todo_tracks),
@@ -0,0 +1,153 @@
+import json
+import logging
+import os
+import sqlite3
+from collections import deque
+
+from domain import RESULT_FILES
+from ttl_export import TTLConverter
+
+
+SCHEMA_VERSION = 3
+
+
+class AdjacencyIndex:
+    # SQLite file next to the results with the byte offset of every record and every edge, indexed from both ends, so
+    # a lookup only touches the neighbourhood that is asked for. The crawler only appends to the result files, so the
+    # index remembers how many bytes of each file it has seen and update() indexes just the records added since. A file
+    # that got smaller was rewritten, e.g. by compact(), and is indexed again from the start.
+
+    def __init__(self, folder: str, indexfile: str = None):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.logger.setLevel("INFO")
+        self.logger.addHandler(logging.StreamHandler())
+        self.folder = folder
+        self.db = sqlite3.connect(indexfile or os.path.join(folder, "index.sqlite"))
+        if self.db.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            # older indexes stored the edges twice, once per direction, and no indexed sizes
+            self.db.executescript("""
+                DROP TABLE IF EXISTS files;
+                DROP TABLE IF EXISTS records;
+                DROP TABLE IF EXISTS edges;
+                PRAGMA user_version = %d;
+            """ % SCHEMA_VERSION)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS files (name TEXT PRIMARY KEY, size INTEGER);
+            CREATE TABLE IF NOT EXISTS records (kind TEXT, id TEXT, offset INTEGER, PRIMARY KEY (kind, id))
+                WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS edges (src_kind TEXT, src_id TEXT, dst_kind TEXT, dst_id TEXT,
+                PRIMARY KEY (src_kind, src_id, dst_kind, dst_id)) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS edges_dst ON edges (dst_kind, dst_id);
+        """)
+        self.files = {}
+
+    def __del__(self):
+        self.db.close()
+        for file in self.files.values():
+            file.close()
+
+    def _sizes(self) -> dict:
+        return {filename: os.path.getsize(os.path.join(self.folder, filename)) for filename, _ in RESULT_FILES.values()}
+
+    def _indexed(self) -> dict:
+        return dict(self.db.execute("SELECT name, size FROM files"))
+
+    def is_current(self) -> bool:
+        return self._indexed() == self._sizes()
+
+    def build(self):
+        with self.db:
+            self.db.execute("DELETE FROM files")
+        self.update()
+
+    def update(self):
+        indexed = self._indexed()
+        with self.db:
+            for kind, (filename, edges) in RESULT_FILES.items():
+                offset = indexed.get(filename, 0)
+                if os.path.getsize(os.path.join(self.folder, filename)) < offset:
+                    self.logger.info("%s got smaller, indexing it again", filename)
+                    offset = 0
+                if offset == 0:
+                    self.db.execute("DELETE FROM records WHERE kind = ?", (kind,))
+                    self.db.execute("DELETE FROM edges WHERE src_kind = ?", (kind,))
+                    if kind in self.files:
+                        # may still be open on the file that compact() replaced
+                        self.files.pop(kind).close()
+                end = self._index_file(kind, filename, edges, offset)
+                self.db.execute("INSERT OR REPLACE INTO files VALUES (?, ?)", (filename, end))
+                if end > offset:
+                    self.logger.info("Indexed %d bytes of %s", end - offset, filename)
+
+    def _index_file(self, kind: str, filename: str, edges: dict, offset: int) -> int:
+        with open(os.path.join(self.folder, filename), "rb") as file:
+            file.seek(offset)
+            for line in file:
+                if not line.endswith(b"\n"):
+                    break  # still being written, indexed next time
+                obj = json.loads(line)
+                key = (kind, obj["id"])
+                inserted = self.db.execute("INSERT OR IGNORE INTO records VALUES (?, ?, ?)", key + (offset,))
+                if inserted.rowcount == 0:
+                    # crawled twice, the last copy replaces the offset and the edges of the earlier one
+                    self.db.execute("UPDATE records SET offset = ? WHERE kind = ? AND id = ?", (offset,) + key)
+                    self.db.execute("DELETE FROM edges WHERE src_kind = ? AND src_id = ?", key)
+                self.db.executemany("INSERT OR IGNORE INTO edges VALUES (?, ?, ?, ?)", self._edges(kind, edges, obj))
+                offset += len(line)
+        return offset
+
+    @staticmethod
+    def _edges(kind: str, edges: dict, obj: dict):
+        for field, target in edges.items():
+            for targetid in obj.get(field, []):
+                yield kind, obj["id"], target, targetid
+
+    def neighbours(self, kind: str, entityid: str) -> list:
+        # edges are stored once, as written by the record they come from, and followed in both directions
+        return self.db.execute("SELECT dst_kind, dst_id FROM edges WHERE src_kind = ? AND src_id = ? "
+                               "UNION SELECT src_kind, src_id FROM edges WHERE dst_kind = ? AND dst_id = ?",
+                               (kind, entityid, kind, entityid)).fetchall()
+
+    def record(self, kind: str, entityid: str):
+        row = self.db.execute("SELECT offset FROM records WHERE kind = ? AND id = ?", (kind, entityid)).fetchone()
+        if row is None:
+            return None  # referenced, but not crawled
+        if kind not in self.files:
+            self.files[kind] = open(os.path.join(self.folder, RESULT_FILES[kind][0]), "rb")
+        self.files[kind].seek(row[0])
+        return json.loads(self.files[kind].readline())
+
+
+class SubgraphExtractor:
+
+    def __init__(self, index: AdjacencyIndex):
+        self.index = index
+
+    def extract(self, seeds: list, hops: int) -> dict:
+        # bounded BFS over edges in both directions, returns (kind, id) -> distance to the closest seed
+        distances = {seed: 0 for seed in seeds}
+        queue = deque(seeds)
+        while queue:
+            node = queue.popleft()
+            if distances[node] >= hops:
+                continue
+            for neighbour in self.index.neighbours(*node):
+                if neighbour not in distances:
+                    distances[neighbour] = distances[node] + 1
+                    queue.append(neighbour)
+        return distances
+
+    def _records(self, nodes):
+        for kind, entityid in nodes:
+            obj = self.index.record(kind, entityid)
+            yield kind, obj if obj is not None else {"id": entityid}
+
+    def write_jsonl(self, nodes, filename: str):
+        with open(filename, "w", encoding="utf8") as file:
+            for kind, obj in self._records(nodes):
+                file.write(json.dumps(dict(obj, kind=kind)) + "\n")
+
+    def write_ttl(self, nodes, filename: str):
+        # TTLConverter needs complete records, the ones that were only referenced are left out
+        TTLConverter(self.index.folder).export_records(
+            filename, ((kind, obj) for kind, obj in self._records(nodes) if "name" in obj))
@@ -21,11 +21,14 @@ def check_rate_limit(resp, *args, **kwargs):
 
 class TLBackend:
 
-    def __init__(self) -> None:
+    def __init__(self, baseurl: str = BASEURL, session=None) -> None:
+        self.baseurl = baseurl
+        self.harvested = []
         self.logger = logging.getLogger("1001tl")
         self.logger.setLevel("DEBUG")
         self.logger.addHandler(logging.StreamHandler())
-        self.session = requests.Session()
+        # anything with the interface of requests.Session works, e.g. transport.Http2Session
+        self.session = session if session is not None else requests.Session()
         self.session.headers["User-Agent"] = "Mozilla/5.0 AppleWebKit/537.36 (KHTML, like Gecko; compatible; Googlebot/2.1; +http://www.google.com/bot.html)"
         self._renew_session()
         self.session.hooks["response"] = [check_rate_limit, self._renew_session]
@@ -33,17 +36,51 @@ class TLBackend:
     def _renew_session(self, *args, **kwargs):
         self.session.cookies["guid"] = str(random.random()*100000000000)
 
+    def _harvest_label(self, labelid: str, name: str):
+        # a label only consists of its name, so the link on a track page already holds all we would fetch for it
+        name = name.strip()
+        if name:
+            label = Label()
+            label.id = labelid
+            label.name = name
+            self.harvested.append(label.freeze())
+
+    def pop_harvested(self) -> list:
+        harvested = self.harvested
+        self.harvested = []
+        return harvested
+
+    def _get_entity_page(self, kind: str, entityid: str):
+        req = self.session.get(self.baseurl + kind + "/" + entityid + "/")
+        if req.status_code == 404:
+            raise EntityNotFoundError("Could not find %s '%s'" % (kind, entityid))
+        if req.status_code != 200:
+            # a maintenance page or the like says nothing about the entity, it is retried like a lost connection
+            raise requests.exceptions.HTTPError("Loading %s '%s' returned status %d"
+                                                % (kind, entityid, req.status_code))
+        return req
+
     def _get_html_soup(self, html):
         html = re.sub(r'&(?!amp;)', r'&amp;', html)
         return BeautifulSoup(html, "html.parser")
 
-    def search_track(self, trackname: str):
-        req = self.session.post(BASEURL + "search/result.php",
+    def search_track(self, trackname: str) -> list:
+        self.logger.debug("Searching track '%s'" % trackname)
+        req = self.session.post(self.baseurl + "search/result.php",
                             data={"main_search": trackname, "search_selection": 2})
+        if req.status_code != 200:
+            # an error page is no empty result, it must not end up in the search cache
+            raise requests.exceptions.HTTPError("Searching '%s' returned status %d" % (trackname, req.status_code))
         bs = self._get_html_soup(req.text)
-        print(bs)
-        trs = bs.select("#middleDiv tr.trTog")
-        print(trs)
+        candidates = []
+        for tr in bs.select("#middleDiv tr.trTog"):
+            link = tr.find("a", href=re.compile(r"^(https?://[^/]+)?/track/"))
+            if link is None:
+                continue
+            trackid = link["href"].split("/track/")[1].split("/")[0]
+            name = link.get_text(" ", strip=True) or tr.get_text(" ", strip=True)
+            candidates.append(TrackCandidate(trackid, name))
+        return candidates
 
     def _parse_track_metadata(self, bs, track: Track) -> Track:
         meta_duration = bs.select("body > meta[itemprop=duration]")
@@ -73,6 +110,7 @@ class TLBackend:
                         if atag:
                             url = atag["href"]
                             track.add_label(url.split("/")[2])
+                            self._harvest_label(url.split("/")[2], atag.get_text())
                     elif subheader == "Supported By":
                         pass  # TODO consider adding info about who has played that
                     else:
@@ -153,7 +191,7 @@ class TLBackend:
         return None
 
     def _get_mediaplayer(self, mid, track: Track) -> Track:
-        req = self.session.get(BASEURL + "ajax/get_medialink.php?idMedia=" + mid)
+        req = self.session.get(self.baseurl + "ajax/get_medialink.php?idMedia=" + mid)
         json = req.json()
         data = json["data"]
         for datae in data:
@@ -161,7 +199,7 @@ class TLBackend:
             src = player.find("iframe")["src"]
             ml = self._parse_mediaplayer_link(src)
             if ml:
-                track.add_medialink(ml.get_obj())
+                track.add_medialink(ml)
             else:
                 self.logger.warning("Unknown media link: %s", src)
         return track
@@ -184,9 +222,7 @@ class TLBackend:
         track = Track()
         track.id = trackid
 
-        req = self.session.get(BASEURL + "track/" + trackid + "/")
-        if req.status_code == 404:
-            raise EntityNotFoundError("Could not find track '%s'" % trackid)
+        req = self._get_entity_page("track", trackid)
 
         bs = self._get_html_soup(req.text)
         track = self._parse_track_metadata(bs, track)
@@ -195,7 +231,7 @@ class TLBackend:
         track = self._parse_track_remixes(bs, track)
         track = self._parse_track_media(bs, track)
 
-        return track
+        return track.freeze()
 
     def _parse_label_metadata(self, bs, label: Label) -> Label:
         th = bs.select("#leftDiv .sideTop th")
@@ -208,15 +244,13 @@ class TLBackend:
         label = Label()
         label.id = labelid
 
-        req = self.session.get(BASEURL + "label/" + labelid + "/")
-        if req.status_code == 404:
-            raise EntityNotFoundError("Could not find label '%s'" % labelid)
+        req = self._get_entity_page("label", labelid)
 
         bs = self._get_html_soup(req.text)
         label = self._parse_label_metadata(bs, label)
         # TODO parse tracks that are released under this label
 
-        return label
+        return label.freeze()
 
     def _parse_tracklist_metadata(self, bs, tl: Tracklist) -> Tracklist:
         meta = bs.select("body > meta[itemprop=name]")[0]
@@ -235,15 +269,13 @@ class TLBackend:
         tl = Tracklist()
         tl.id = tracklistid
 
-        req = self.session.get(BASEURL + "tracklist/" + tracklistid + "/")
-        if req.status_code == 404:
-            raise EntityNotFoundError("Could not find tracklist '%s'" % tracklistid)
+        req = self._get_entity_page("tracklist", tracklistid)
 
         bs = self._get_html_soup(req.text)
         tl = self._parse_tracklist_metadata(bs, tl)
         tl = self._parse_tracklist_tracks(bs, tl)
 
-        return tl
+        return tl.freeze()
 
     def _parse_artist_sides_top(self, bs, a: Artist) -> Artist:
         topbox = bs.select("#leftContent .side table.sideTop")[0]
@@ -283,6 +315,13 @@ class TLBackend:
                     link = sibl.find("a")
                     if link is not None:
                         a.add_alias(link["href"].split("/")[2])
+            elif header == "Name Changed To":
+                for sibl in th.parent.next_siblings:
+                    if type(sibl) != Tag:
+                        continue
+                    link = sibl.find("a")
+                    if link is not None:
+                        a.add_renamed_to(link["href"].split("/")[2])
             elif header == "Short Link":
                 pass  # no interesting
             else:
@@ -328,12 +367,10 @@ class TLBackend:
         a = Artist()
         a.id = artistid
 
-        req = self.session.get(BASEURL + "artist/" + artistid + "/")
-        if req.status_code == 404:
-            raise EntityNotFoundError("Could not find artist '%s'" % artistid)
+        req = self._get_entity_page("artist", artistid)
 
         bs = self._get_html_soup(req.text)
         a = self._parse_artist_sides(bs, a)
         a = self._parse_artist_tracks(bs, a)
 
-        return a
+        return a.freeze()
@@ -0,0 +1,93 @@
+import logging
+from urllib.parse import urlparse
+
+import requests
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+try:
+    import brotli  # httpx only decodes br responses when this is installed
+    ACCEPT_ENCODING = "br, gzip, deflate"
+except ImportError:
+    ACCEPT_ENCODING = "gzip, deflate"
+
+
+class TransferStats:
+
+    def __init__(self):
+        self.requests = {}
+        self.wire_bytes = {}
+        self.decoded_bytes = {}
+
+    def record(self, kind: str, wire_bytes: int, decoded_bytes: int):
+        self.requests[kind] = self.requests.get(kind, 0) + 1
+        self.wire_bytes[kind] = self.wire_bytes.get(kind, 0) + wire_bytes
+        self.decoded_bytes[kind] = self.decoded_bytes.get(kind, 0) + decoded_bytes
+
+    def summary(self) -> dict:
+        return {kind: {"requests": self.requests[kind],
+                       "wire_bytes": self.wire_bytes[kind],
+                       "decoded_bytes": self.decoded_bytes[kind],
+                       "wire_bytes_per_request": self.wire_bytes[kind] // self.requests[kind]}
+                for kind in self.requests}
+
+
+class Http2Session:
+    # Stands in for the parts of requests.Session that TLBackend uses (get, post, headers, cookies and response hooks)
+    # on top of a single httpx client, which multiplexes all requests to a host over one HTTP/2 connection and
+    # negotiates compressed transfer. Every response is accounted by the first path segment of its url, i.e. by
+    # entity type.
+
+    def __init__(self, timeout=30.0, prior_knowledge=False):
+        if httpx is None:
+            raise ImportError("Http2Session needs httpx, install it with 'pip3 install httpx[http2]'")
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.logger.setLevel("INFO")
+        self.logger.addHandler(logging.StreamHandler())
+        # prior knowledge speaks HTTP/2 over plain http, which local stand-in servers usually offer instead of TLS
+        # renamed entities answer with a redirect to their new page, as requests follows it by default
+        self.client = httpx.Client(http1=not prior_knowledge, http2=True, timeout=timeout, follow_redirects=True,
+                                   headers={"Accept-Encoding": ACCEPT_ENCODING})
+        self.hooks = {"response": []}
+        self.stats = TransferStats()
+
+    @property
+    def headers(self):
+        return self.client.headers
+
+    @property
+    def cookies(self):
+        return self.client.cookies
+
+    def request(self, method: str, url: str, **kwargs):
+        # the crawl loops retry on the exceptions of requests, they do not know the ones of httpx
+        try:
+            resp = self.client.request(method, url, **kwargs)
+        except httpx.TransportError as e:
+            raise requests.exceptions.ConnectionError(repr(e)) from e
+        except httpx.HTTPError as e:
+            raise requests.exceptions.RequestException(repr(e)) from e
+        kind = urlparse(url).path.strip("/").split("/")[0] or "/"
+        self.stats.record(kind, resp.num_bytes_downloaded, len(resp.content))
+        self.logger.debug("%s %s: %s, %d bytes on the wire, %d decoded", method, url, resp.http_version,
+                          resp.num_bytes_downloaded, len(resp.content))
+        for hook in self.hooks["response"]:
+            hook(resp)
+        return resp
+
+    def get(self, url: str, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, data=None, **kwargs):
+        return self.request("POST", url, data=data, **kwargs)
+
+    def close(self):
+        self.client.close()
+
+
+def http2_session(baseurl: str, **kwargs) -> Http2Session:
+    # a plain http site (e.g. a local stand-in) only gets HTTP/2 with prior knowledge, httpx would fall back to HTTP/1.1
+    return Http2Session(prior_knowledge=baseurl.startswith("http://"), **kwargs)
@@ -0,0 +1,142 @@
+import json
+import isodate
+from typing import Callable, IO, Dict, Iterable, Tuple
+
+from canonical import ArtistCanonicalizer
+
+
+class TTLConverter:
+
+    def __init__(self, folder: str, canonicalize: bool = False):
+        self.folder = folder
+        self.prefix = "tl1001"
+        self.canonicalizer = ArtistCanonicalizer() if canonicalize else None
+        self.canonical_artists = {}
+
+    def export(self, filename: str):
+        with open(filename, "w", encoding="utf8") as file:
+            self._write_header(file)
+            if self.canonicalizer is not None:
+                # aliases and renames collapse into one node named after the root of their group, only artists that
+                # have some are held back until all their records were read
+                self._write_from_file(file, "artists.txt", lambda out, a: self.canonicalizer.add_obj(a))
+                self._write_from_file(file, "artists.txt", self._merge_artist)
+                for merged in self.canonical_artists.values():
+                    self._write_artists(file, merged)
+            else:
+                self._write_from_file(file, "artists.txt", self._write_artists)
+            self._write_from_file(file, "labels.txt", self._write_labels)
+            self._write_from_file(file, "tracks.txt", self._write_tracks)
+
+    def export_records(self, filename: str, records: Iterable[Tuple[str, Dict]]):
+        writers = {"artist": self._write_artists, "label": self._write_labels, "track": self._write_tracks}
+        with open(filename, "w", encoding="utf8") as file:
+            self._write_header(file)
+            for kind, obj in records:
+                if kind in writers:
+                    writers[kind](file, obj)
+
+    def _write_header(self, outfile: IO):
+        outfile.write("@prefix mo: <http://purl.org/ontology/mo/> . \n")
+        outfile.write("@prefix dc: <http://purl.org/dc/elements/1.1/> . \n")
+        outfile.write("@prefix foaf: <http://xmlns.com/foaf/0.1/> .\n")
+        outfile.write("@prefix "+self.prefix+": <http://1001tracklists.com/> .\n")
+        outfile.write("@prefix owl: <http://www.w3.org/2002/07/owl#> .\n")
+        outfile.write("@prefix xsd: <http://www.w3.org/2001/XMLSchema#> .\n")
+        outfile.write("@prefix semsys: <http://www.semsysg20.org/ontology#> .\n")
+
+    def _conv_pred(self, pred):
+        return "<"+self.prefix+":"+pred+">"
+
+    def _conv_artist(self, artistid: str) -> str:
+        if self.canonicalizer is not None:
+            artistid = self.canonicalizer.find(artistid)
+        return self.prefix + ":" + artistid
+
+    def _conv_track(self, trackid: str) -> str:
+        return self.prefix + ":" + trackid
+
+    def _conv_label(self, labelid: str) -> str:
+        return self.prefix + ":" + labelid
+
+    def _conv_tracklist(self, tracklist: str) -> str:
+        return self.prefix + ":" + tracklist
+
+    def _write_from_file(self, outfile: IO, filename: str, func: Callable[[IO, Dict], None]):
+        with open(self.folder + "/" + filename) as file:
+            for line in file:
+                obj = json.loads(line)
+                func(outfile, obj)
+
+    def _merge_artist(self, out, a):
+        if len(self.canonicalizer.group(a["id"])) == 1:
+            self._write_artists(out, a)  # no aliases or renames, nothing to wait for
+            return
+        root = self.canonicalizer.find(a["id"])
+        merged = self.canonical_artists.setdefault(root, {"id": root, "name": a["name"], "nicks": [], "members": []})
+        if a["id"] == root and merged["name"] != a["name"]:
+            merged["nicks"].append(merged["name"])
+            merged["name"] = a["name"]
+        elif a["name"] != merged["name"] and a["name"] not in merged["nicks"]:
+            merged["nicks"].append(a["name"])
+        for member in a["members"]:
+            member = self.canonicalizer.find(member)
+            if member != root and member not in merged["members"]:
+                merged["members"].append(member)
+
+    def _write_artists(self, out, a):
+        out.write(self._conv_artist(a["id"]) + " a mo:MusicGroup ;\n")
+        for member in a["members"]:
+            out.write(" foaf:member " + self._conv_artist(member) + " ;\n")
+        # TODO partOf
+        if "aliases" in a:
+            for alias in a["aliases"]:
+                out.write(" owl:sameAs " + self._conv_artist(alias) + " ;\n")
+        if "nicks" in a:
+            for nick in a["nicks"]:
+                out.write(" foaf:nick \"" + nick + "\" ;\n")
+        out.write(" foaf:name \"" + a["name"] + "\" .\n\n")
+
+    def _write_labels(self, out, label):
+        out.write(self._conv_label(label["id"]) + " a mo:Label ; \n foaf:name \"" + label["name"] + "\" .\n")
+
+    def _write_tracks(self, out, track):
+        s = self._conv_track(track["id"]) + " a mo:Track ; \n"
+        s = s + " dc:title \"" + track["name"] + "\" ; \n"
+        if track["duration"] != -1:
+            delta = isodate.parse_duration(track["duration"])
+            s = s + "mo:duration" + " \"" + str(delta.seconds) + str(delta.microseconds / 1000) + "\" ; \n"
+        for artist in dict.fromkeys(self._conv_artist(artist) for artist in track["artists"]):
+            s = s + (" foaf:maker " + artist + " ; \n")
+        for label in track["labels"]:
+            s = s + (" mo:label " + self._conv_label(label) + " ; \n")
+        for tracklist in track["tracklists"]:
+            s = s + (self._conv_pred("tracklist") + " " + self._conv_tracklist(tracklist) + " ; \n")
+        if "remix" in track:
+            for remix in track["remix"]:
+                s = s + (" semsys:hasRemix" + " " + self._conv_track(remix) + " ; \n")
+        if "remix_of" in track:
+            for remixOf in track["remix_of"]:
+                s = s + (" semsys:remixOf" + " " + self._conv_track(remixOf) + " ; \n")
+        if "mashup" in track:
+            for mashup in track["mashup"]:
+                s = s + (" semsys:hasRemix" + " " + self._conv_track(mashup) + " ; \n")
+        if "mashup_tracks" in track:
+            for mashup_tracks in track["mashup_tracks"]:
+                s = s + (" semsys:remixOf" + " " + self._conv_track(mashup_tracks) + " ; \n")
+        if "medialinks" in track:
+            for medialink in track["medialinks"]:
+                type = medialink["type"]
+                if type == "spotify":
+                    pred = "semsys:spotifyExternalUrl"
+                elif type == "youtube":
+                    pred = "semsys:youtubeLink"
+                else:
+                    pred = self._conv_pred(type + "_link")
+                link = medialink["link"]
+                if link[0:5] != "https" and link[0:4] == "http":
+                    link = "https" + link[4:]
+                s = s + " " + pred + " \"" + link + "\"^^xsd:anyURI ; \n"
+        s = s[:-3] + ". \n"
+        out.write(s)
+
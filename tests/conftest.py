@@ -0,0 +1,7 @@
+import os
+import sys
+
+# the modules live flat in src/ and import each other by name, like the scripts do when run from there
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+sys.path.insert(0, SRC)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -0,0 +1,134 @@
+import gzip
+import http.server
+import socket
+import threading
+import time
+import urllib.parse
+
+# A local stand-in for 1001tracklists: serves fixed pages by path, everything else is a 404. GET and POST requests are
+# answered alike, the forms of POST requests are kept in `posted`.
+
+RATE_LIMIT_PAGE = "<html><body>Your access has been blocked for one hour due to abnormal use.</body></html>"
+
+
+def tracklist_page(name: str, trackids: list) -> str:
+    rows = "".join('<tr class="tlpItem"><td><div class="tlToogleData"><meta itemprop="url" content="/track/%s/x/">'
+                   '</div></td></tr>' % trackid for trackid in trackids)
+    return '<html><body><meta itemprop="name" content="%s"><table class="tl">%s</table></body></html>' % (name, rows)
+
+
+def track_page(name: str) -> str:
+    return '<html><body><meta itemprop="name" content="%s"><meta itemprop="duration" content="PT3M"></body></html>' % name
+
+
+class StandinServer:
+
+    def __init__(self, pages: dict = None):
+        # path -> (status, body), bodies may be str or bytes
+        self.pages = dict(pages or {})
+        self.requested = []
+        self.posted = []
+        standin = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                standin.requested.append(self.path)
+                self.respond()
+
+            def do_POST(self):
+                form = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode("utf8")
+                standin.requested.append(self.path)
+                standin.posted.append((self.path, dict(urllib.parse.parse_qsl(form))))
+                self.respond()
+
+            def respond(self):
+                status, body = standin.pages.get(self.path, (404, "not found"))
+                body = body.encode("utf8") if isinstance(body, str) else body
+                self.send_response(status)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.baseurl = "http://127.0.0.1:%d/" % self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def page(self, path: str, body, status: int = 200):
+        self.pages[path] = (status, body)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class Http2StandinServer:
+    # The same pages over HTTP/2 with prior knowledge (h2c), gzip compressed when the client accepts it. Needs hypercorn.
+    # A page may come with a third element, a dict of extra response headers, e.g. the location of a redirect.
+
+    def __init__(self, pages: dict = None):
+        import asyncio
+        from hypercorn.config import Config
+
+        self.pages = dict(pages or {})
+        self.requested = []
+        self.config = Config()
+        self.config.bind = ["127.0.0.1:%d" % free_port()]
+        self.baseurl = "http://%s/" % self.config.bind[0]
+        self.loop = asyncio.new_event_loop()
+        self.stopped = asyncio.Event()
+        self.thread = threading.Thread(target=self._serve, daemon=True)
+
+    async def app(self, scope, receive, send):
+        if scope["type"] != "http":
+            return
+        self.requested.append((scope["path"], scope["http_version"]))
+        status, body, *extra = self.pages.get(scope["path"], (404, "not found"))
+        body = body.encode("utf8") if isinstance(body, str) else body
+        headers = [(b"content-type", b"text/html")]
+        for name, value in (extra[0] if extra else {}).items():
+            headers.append((name.lower().encode(), value.encode()))
+        if b"gzip" in dict(scope["headers"]).get(b"accept-encoding", b""):
+            body = gzip.compress(body)
+            headers.append((b"content-encoding", b"gzip"))
+        headers.append((b"content-length", str(len(body)).encode()))
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+    def _serve(self):
+        from hypercorn.asyncio import serve
+        self.loop.run_until_complete(serve(self.app, self.config, shutdown_trigger=self.stopped.wait))
+
+    def __enter__(self):
+        self.thread.start()
+        wait_for_port(self.config.bind[0])
+        return self
+
+    def __exit__(self, *args):
+        self.loop.call_soon_threadsafe(self.stopped.set)
+        self.thread.join(10)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(address: str, timeout=10.0):
+    host, port = address.split(":")
+    deadline = time.time() + timeout
+    while True:
+        try:
+            socket.create_connection((host, int(port)), 0.5).close()
+            return
+        except OSError:
+            if time.time() > deadline:
+                raise
+            time.sleep(0.05)
@@ -0,0 +1,79 @@
+import json
+
+import pytest
+
+from canonical import ArtistCanonicalizer
+from domain import Artist
+from storage import TemporaryMusicStorage, TrackingMissingMusicStorage
+
+
+def make_artist(artistid: str, name: str = "", aliases=(), members=()) -> Artist:
+    artist = Artist()
+    artist.id = artistid
+    artist.name = name or artistid
+    for alias in aliases:
+        artist.add_alias(alias)
+    for member in members:
+        artist.add_member(member)
+    return artist.freeze()
+
+
+def test_smallest_id_is_the_root():
+    canonicalizer = ArtistCanonicalizer()
+    canonicalizer.union("c", "d")
+    canonicalizer.union("d", "b")
+    canonicalizer.add_relations("x", ["y"])
+    assert canonicalizer.find("d") == "b"
+    assert sorted(canonicalizer.group("c")) == ["b", "c", "d"]
+    assert canonicalizer.group("y") == ["x", "y"]
+    assert canonicalizer.group("lonely") == ["lonely"]
+
+
+def test_groups_survive_export(tmp_path):
+    canonicalizer = ArtistCanonicalizer()
+    canonicalizer.add_obj({"id": "b", "aliases": ["a"], "renamed_to": ["c"]})
+    canonicalizer.export_groups(str(tmp_path / "canonical.json"))
+
+    imported = ArtistCanonicalizer()
+    imported.import_groups(str(tmp_path / "canonical.json"))
+    assert sorted(imported.group("c")) == ["a", "b", "c"]
+    assert imported.find("c") == "a"
+
+
+def test_stored_artists_drop_their_aliases_from_the_frontier():
+    musicstore = TrackingMissingMusicStorage(TemporaryMusicStorage(), ArtistCanonicalizer())
+    musicstore.todo_artists.update(["a1", "a2"])
+    musicstore.put_artist(make_artist("a0", aliases=["a1"], members=["a3"]))
+
+    # a1 names the artist that was just stored, a3 is somebody else
+    assert musicstore.todo_artists == {"a2", "a3"}
+    musicstore.add_todo("artist", ["a0", "a1", "a4"])
+    assert musicstore.todo_artists == {"a2", "a3", "a4"}
+
+
+def test_without_canonicalizer_aliases_are_crawled():
+    musicstore = TrackingMissingMusicStorage(TemporaryMusicStorage())
+    musicstore.put_artist(make_artist("a0", aliases=["a1"]))
+    assert musicstore.todo_artists == {"a1"}
+
+
+def test_ttl_merges_groups_and_streams_singletons(tmp_path):
+    pytest.importorskip("isodate")
+    from ttl_export import TTLConverter
+
+    with open(tmp_path / "artists.txt", "w") as file:
+        for artist in [make_artist("a1", "Old Name", aliases=["a0"]), make_artist("s0", "Solo"),
+                       make_artist("a0", "New Name", aliases=["a1"])]:
+            file.write(json.dumps(artist.to_obj()) + "\n")
+    for filename in ["labels.txt", "tracks.txt"]:
+        open(tmp_path / filename, "w").close()
+
+    converter = TTLConverter(str(tmp_path), canonicalize=True)
+    converter.export(str(tmp_path / "data.ttl"))
+    with open(tmp_path / "data.ttl") as file:
+        ttl = file.read()
+    assert ttl.count("tl1001:a0 a mo:MusicGroup") == 1
+    assert "tl1001:a1 a mo:MusicGroup" not in ttl
+    assert 'foaf:nick "Old Name"' in ttl
+    assert ttl.count("tl1001:s0 a mo:MusicGroup") == 1
+    assert list(converter.canonical_artists) == ["a0"]
@@ -0,0 +1,52 @@
+import pytest
+
+from cli import apply_config, build_parser
+
+CONFIG = """
+[DEFAULT]
+data = /srv/results
+
+[crawl]
+scrape-timeout = 2.5
+limit = 10
+http2 = yes
+
+[bootstrap]
+sitemap = http://a/sitemap.xml http://b/sitemap.xml.gz
+no-canonicalize = true
+"""
+
+
+def parse(tmp_path, config: str, argv: list):
+    configfile = tmp_path / "cli.ini"
+    configfile.write_text(config)
+    config_options = {}
+    parser = build_parser(config_options)
+    apply_config(parser, config_options, str(configfile))
+    return parser.parse_args(argv)
+
+
+def test_config_values_become_defaults(tmp_path):
+    args = parse(tmp_path, CONFIG, ["crawl"])
+    assert (args.data, args.scrape_timeout, args.limit, args.http2, args.no_canonicalize) == \
+        ("/srv/results", 2.5, 10, True, False)
+
+    args = parse(tmp_path, CONFIG, ["bootstrap"])
+    assert args.sitemap == ["http://a/sitemap.xml", "http://b/sitemap.xml.gz"]
+    assert args.no_canonicalize is True
+    assert args.scrape_timeout is None
+
+    args = parse(tmp_path, CONFIG, ["diff", "old"])
+    assert (args.data, args.run_size) == ("/srv/results", 100000)
+
+
+def test_command_line_overrides_config(tmp_path):
+    args = parse(tmp_path, CONFIG, ["crawl", "--scrape-timeout", "7", "--data", "here"])
+    assert (args.data, args.scrape_timeout, args.limit) == ("here", 7.0, 10)
+
+
+def test_invalid_config_values_are_reported(tmp_path):
+    with pytest.raises(SystemExit):
+        parse(tmp_path, "[crawl]\nlimit = many\n", ["crawl"])
+    with pytest.raises(SystemExit):
+        parse(tmp_path, "[crawl]\nhttp2 = maybe\n", ["crawl"])
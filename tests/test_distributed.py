@@ -0,0 +1,140 @@
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+
+from conftest import SRC
+from distributed import CrawlCoordinator, connect_coordinator
+from domain import Tracklist
+from failures import FailureLedger, RetryQueue
+from storage import TemporaryMusicStorage, TrackingMissingMusicStorage
+from standin import StandinServer, track_page, free_port, RATE_LIMIT_PAGE
+
+AUTHKEY = b"1001tl"
+
+
+def make_datafolder(folder, tracks: list) -> str:
+    for filename in ["tracks.txt", "artists.txt", "labels.txt", "tracklists.txt"]:
+        open(os.path.join(folder, filename), "w").close()
+    with open(os.path.join(folder, "todo.json"), "w") as file:
+        json.dump({"tracks": tracks, "artists": [], "labels": [], "tracklists": []}, file)
+    return str(folder)
+
+
+def start(mode: str, address: str, baseurl: str, *options) -> subprocess.Popen:
+    return subprocess.Popen([sys.executable, "main_distributed.py", mode, "--address", address, "--baseurl", baseurl,
+                             "--scrape-timeout", "0"] + list(options),
+                            cwd=SRC, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def connect(address: str, timeout=20.0):
+    host, port = address.split(":")
+    deadline = time.time() + timeout
+    while True:
+        try:
+            return connect_coordinator((host, int(port)), AUTHKEY)
+        except ConnectionError:
+            if time.time() > deadline:
+                raise
+            time.sleep(0.2)
+
+
+def wait_for(condition, timeout=30.0):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "timed out"
+        time.sleep(0.2)
+
+
+def stop(process: subprocess.Popen, timeout=20.0) -> float:
+    start = time.time()
+    process.send_signal(signal.SIGTERM)
+    process.wait(timeout)
+    return time.time() - start
+
+
+def crawled_ids(folder) -> set:
+    with open(os.path.join(folder, "tracks.txt")) as file:
+        return {json.loads(line)["id"] for line in file}
+
+
+def test_expired_lease_is_reassigned(tmp_path):
+    tracks = ["t%d" % i for i in range(6)]
+    data = make_datafolder(tmp_path, tracks)
+    address = "127.0.0.1:%d" % free_port()
+    with StandinServer({"/track/%s/" % t: (200, track_page(t)) for t in tracks}) as standin:
+        coordinator = start("coordinator", address, standin.baseurl, "--data", data, "--shards", "1",
+                            "--batch-size", "3", "--lease-timeout", "1")
+        worker = None
+        try:
+            proxy = connect(address)
+            # a worker that dies right after claiming: its ids must go to the next worker once the lease expires
+            ghost = proxy.claim("ghost")
+            assert len(ghost["ids"]) == 3
+
+            worker = start("worker", address, standin.baseurl)
+            wait_for(lambda: proxy.stats()["track"] == 0 and proxy.stats()["leases"] == 0)
+            assert set(ghost["ids"]) <= {path.split("/")[2] for path in standin.requested}
+
+            # completing the expired lease afterwards changes nothing
+            proxy.complete(ghost["lease"], [], [])
+            assert proxy.stats()["track"] == 0
+        finally:
+            if worker is not None:
+                stop(worker)
+            stop(coordinator)
+
+    assert crawled_ids(data) == set(tracks)
+    with open(os.path.join(data, "todo.json")) as file:
+        assert json.load(file)["tracks"] == []
+
+
+def test_shutdown_does_not_wait_for_ratelimited_workers(tmp_path):
+    data = make_datafolder(tmp_path, ["t0"])
+    address = "127.0.0.1:%d" % free_port()
+    with StandinServer({"/track/t0/": (403, RATE_LIMIT_PAGE)}) as standin:
+        coordinator = start("coordinator", address, standin.baseurl, "--data", data, "--workers", "1")
+        try:
+            wait_for(lambda: "/track/t0/" in standin.requested)
+            time.sleep(0.5)
+        finally:
+            # the worker is now waiting out the 61 minute ratelimit pause
+            assert stop(coordinator) < 10
+
+    with open(os.path.join(data, "todo.json")) as file:
+        assert json.load(file)["tracks"] == ["t0"]
+
+
+def test_claims_pop_shard_queues(tmp_path):
+    ledger = FailureLedger(str(tmp_path / "failed.txt"))
+    ledger.record("track", "t3", "not found")
+    retries = RetryQueue()
+    retries.failed("track", "t5", give_up=False)
+    musicstore = TrackingMissingMusicStorage(TemporaryMusicStorage(), ledger=ledger, retries=retries)
+    musicstore.todo_tracks.update("t%d" % i for i in range(10))
+    musicstore.todo_tracklists.add("tl0")
+    coordinator = CrawlCoordinator(musicstore, num_shards=4, batch_size=2, ledger=ledger)
+
+    tracklist_lease = coordinator.claim("w")
+    assert tracklist_lease["ids"] == ["tl0"]
+    claimed = []
+    lease = coordinator.claim("w")
+    while lease is not None:
+        assert lease["type"] == "track"
+        claimed += lease["ids"]
+        lease = coordinator.claim("w")
+    assert sorted(claimed) == ["t%d" % i for i in range(10) if i not in (3, 5)]
+    # ledgered ids and ids waiting for a retry leave the frontier the first time a claim runs into them
+    assert "t3" not in musicstore.todo_tracks
+    assert "t5" not in musicstore.todo_tracks
+
+    # tracks the tracklist links to become claimable once it is stored
+    tracklist = Tracklist()
+    tracklist.id = "tl0"
+    tracklist.add_track("t0")
+    tracklist.add_track("t20")
+    coordinator.complete(tracklist_lease["lease"], [("tracklist", tracklist.freeze())], [])
+    assert coordinator.claim("w")["ids"] == ["t20"]
+    assert coordinator.claim("w") is None
@@ -0,0 +1,30 @@
+import pickle
+
+import pytest
+
+from domain import Track
+
+
+def make_track() -> Track:
+    track = Track()
+    track.id = "t0"
+    track.name = "Track"
+    track.add_artists("a0")
+    return track
+
+
+def test_frozen_records_refuse_assignment():
+    track = make_track().freeze()
+    with pytest.raises(AttributeError):
+        track.name = "mutated"
+    with pytest.raises(AttributeError):
+        track.artists.append("a1")
+    assert track.to_obj()["name"] == "Track"
+    assert "_frozen" not in track.to_obj()
+
+
+def test_frozen_records_survive_pickle():
+    track = pickle.loads(pickle.dumps(make_track().freeze()))
+    assert track.to_obj() == make_track().to_obj()
+    with pytest.raises(AttributeError):
+        track.name = "mutated"
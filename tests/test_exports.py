@@ -0,0 +1,103 @@
+import json
+import os
+
+import pytest
+
+# t0 was crawled twice, the second copy lost artist a0 and gained a1
+TRACKS = [
+    {"id": "t0", "name": "old", "artists": ["a0"], "duration": "PT3M", "medialinks": []},
+    {"id": "t1", "name": "other", "artists": ["a0"], "duration": "PT4M", "medialinks": []},
+    {"id": "t0", "name": "new", "artists": ["a1"], "duration": "PT3M", "medialinks": []},
+]
+ARTISTS = [{"id": "a0", "name": "Artist"}]
+
+
+@pytest.fixture
+def results(tmp_path):
+    for filename, records in [("tracks.txt", TRACKS), ("artists.txt", ARTISTS), ("labels.txt", []),
+                              ("tracklists.txt", [])]:
+        with open(tmp_path / filename, "w") as file:
+            file.writelines(json.dumps(record) + "\n" for record in records)
+    return str(tmp_path)
+
+
+def test_parquet_keeps_the_last_copy(results):
+    pq = pytest.importorskip("pyarrow.parquet")
+    from parquet_export import ParquetExporter
+
+    ParquetExporter(results).export(os.path.join(results, "parquet"))
+    tracks = pq.read_table(os.path.join(results, "parquet", "tracks.parquet")).to_pylist()
+    edges = pq.read_table(os.path.join(results, "parquet", "track_artists.parquet")).to_pylist()
+    assert sorted((t["id"], t["name"]) for t in tracks) == [("t0", "new"), ("t1", "other")]
+    assert sorted((e["src_id"], e["dst_id"]) for e in edges) == [("t0", "a1"), ("t1", "a0")]
+
+
+def test_graph_keeps_the_last_copy(results):
+    pytest.importorskip("isodate")
+    from graph_export import GraphImportExporter
+
+    GraphImportExporter(results).export(os.path.join(results, "graph"))
+    with open(os.path.join(results, "graph", "tracks.csv")) as file:
+        tracks = [line.split(",")[:2] for line in file.read().splitlines()[1:]]
+    with open(os.path.join(results, "graph", "track_artists.csv")) as file:
+        edges = [line.split(",")[:2] for line in file.read().splitlines()[1:]]
+    with open(os.path.join(results, "graph", "artists.csv")) as file:
+        artists = [line.split(",")[:2] for line in file.read().splitlines()[1:]]
+    assert sorted(tracks) == [["t0", "new"], ["t1", "other"]]
+    assert sorted(edges) == [["t0", "a1"], ["t1", "a0"]]
+    # a1 is only referenced, a0 was crawled
+    assert sorted(artists) == [["a0", "Artist"], ["a1", ""]]
+
+
+def test_idset():
+    from maintenance import IdSet
+
+    ids = IdSet(capacity=4)
+    for i in range(1000):
+        ids.add("t%d" % i)
+    ids.add("t0")
+    assert len(ids) == 1000
+    assert all("t%d" % i in ids for i in range(1000))
+    assert "t1000" not in ids
+
+
+def test_subgraph_follows_the_edges_of_the_last_copy(results):
+    pytest.importorskip("isodate")
+    from subgraph import AdjacencyIndex, SubgraphExtractor
+
+    index = AdjacencyIndex(results)
+    index.build()
+    assert index.record("track", "t0")["name"] == "new"
+    assert sorted(index.neighbours("track", "t0")) == [("artist", "a1")]
+    assert sorted(index.neighbours("artist", "a0")) == [("track", "t1")]
+    assert SubgraphExtractor(index).extract([("track", "t0")], 3) == {("track", "t0"): 0, ("artist", "a1"): 1}
+
+
+def test_subgraph_index_is_updated_with_appended_records(results):
+    pytest.importorskip("isodate")
+    from maintenance import compact
+    from subgraph import AdjacencyIndex
+
+    index = AdjacencyIndex(results)
+    index.update()
+    with open(os.path.join(results, "tracks.txt"), "a") as file:
+        file.write(json.dumps({"id": "t2", "name": "added", "artists": ["a0"]}) + "\n")
+        file.write('{"id": "t3", "na')  # still being written
+    assert not index.is_current()
+    index.update()
+    assert index.record("track", "t2")["name"] == "added"
+    assert index.record("track", "t3") is None
+    assert sorted(index.neighbours("artist", "a0")) == [("track", "t1"), ("track", "t2")]
+
+    with open(os.path.join(results, "tracks.txt"), "a") as file:
+        file.write('me": "finished", "artists": ["a1"]}\n')
+    index.update()
+    assert index.is_current()
+    assert index.record("track", "t3")["name"] == "finished"
+
+    # compacting drops the first copy of t0, all offsets in the file move
+    compact(results)
+    index.update()
+    assert index.is_current()
+    assert [index.record("track", t)["name"] for t in ["t0", "t1", "t2", "t3"]] == ["new", "other", "added", "finished"]
+    assert sorted(index.neighbours("artist", "a1")) == [("track", "t0"), ("track", "t3")]
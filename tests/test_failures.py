@@ -0,0 +1,82 @@
+from crawler import crawl_entity
+from domain import Tracklist
+from failures import FailureLedger, OutageDetector, RetryQueue
+from standin import StandinServer
+from storage import TemporaryMusicStorage, TrackingMissingMusicStorage
+from tl1001 import TLBackend
+
+UNREACHABLE = "http://127.0.0.1:1/"
+
+
+def make_crawl(tmp_path, baseurl):
+    ledger = FailureLedger(str(tmp_path / "failed.txt"))
+    # no backoff, every retry is due at once
+    retries = RetryQueue(max_attempts=3, base_delay=0)
+    musicstore = TrackingMissingMusicStorage(TemporaryMusicStorage(), ledger=ledger, retries=retries)
+    return musicstore, TLBackend(baseurl), retries, ledger
+
+
+def test_connection_errors_are_never_ledgered(tmp_path):
+    musicstore, tlb, retries, ledger = make_crawl(tmp_path, UNREACHABLE)
+    outage = OutageDetector(max_consecutive=4)
+    for _ in range(6):
+        crawl_entity(musicstore, tlb, retries, ledger, "track", "t0", 0, outage)
+        assert retries.pending() == [("track", "t0")]
+        retries.pop_due()
+
+    assert not ledger.has_failed("track", "t0")
+    assert outage.is_down()
+
+
+def test_parse_errors_are_ledgered_after_the_last_attempt(tmp_path):
+    with StandinServer({"/track/t0/": (200, "<html><body></body></html>")}) as standin:
+        musicstore, tlb, retries, ledger = make_crawl(tmp_path, standin.baseurl)
+        outage = OutageDetector()
+        outage.failed()
+        for _ in range(3):
+            crawl_entity(musicstore, tlb, retries, ledger, "track", "t0", 0, outage)
+            retries.pop_due()
+
+    assert ledger.has_failed("track", "t0")
+    assert outage.consecutive == 0
+
+
+def test_not_found_is_ledgered_at_once(tmp_path):
+    with StandinServer() as standin:
+        musicstore, tlb, retries, ledger = make_crawl(tmp_path, standin.baseurl)
+        crawl_entity(musicstore, tlb, retries, ledger, "track", "t0", 0)
+
+    assert ledger.has_failed("track", "t0")
+    assert len(retries) == 0
+
+
+def test_server_errors_are_never_ledgered(tmp_path):
+    with StandinServer({"/track/t0/": (503, "<html><body>Down for maintenance</body></html>")}) as standin:
+        musicstore, tlb, retries, ledger = make_crawl(tmp_path, standin.baseurl)
+        outage = OutageDetector()
+        for _ in range(5):
+            crawl_entity(musicstore, tlb, retries, ledger, "track", "t0", 0, outage)
+            assert retries.pop_due() == ("track", "t0")
+
+    assert not ledger.has_failed("track", "t0")
+    assert outage.consecutive == 5
+
+
+def test_waiting_ids_stay_out_of_the_frontier(tmp_path):
+    musicstore, tlb, _, ledger = make_crawl(tmp_path, UNREACHABLE)
+    retries = musicstore.retries = RetryQueue()
+    crawl_entity(musicstore, tlb, retries, ledger, "track", "t0", 0)
+
+    # another page links the track while it waits for its backoff
+    tracklist = Tracklist()
+    tracklist.id = "tl0"
+    tracklist.add_track("t0")
+    tracklist.add_track("t1")
+    musicstore.put_tracklist(tracklist)
+    musicstore.add_todo("track", ["t0"])
+    assert musicstore.todo_tracks == {"t1"}
+
+    # an id that is popped anyway is neither fetched nor scheduled a second time
+    crawl_entity(musicstore, tlb, retries, ledger, "track", "t0", 0)
+    assert len(retries) == 1
+    assert retries.attempts_of("track", "t0") == 1
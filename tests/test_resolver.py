@@ -0,0 +1,85 @@
+import json
+import os
+from argparse import Namespace
+
+import main_resolve
+from resolver import TrackNameResolver, normalize_trackname
+from standin import StandinServer
+from tl1001 import TLBackend
+
+SEARCH = "/search/result.php"
+
+
+def search_page(rows: list) -> str:
+    # rows of (href, text), a row without href has no track link
+    trs = "".join('<tr class="trTog"><td>%s</td></tr>' % ('<a href="%s">%s</a>' % (href, text) if href else text)
+                  for href, text in rows)
+    return '<html><body><div id="middleDiv"><table>%s</table></div>' \
+           '<table><tr class="trTog"><td><a href="/track/outside/">Sidebar</a></td></tr></table></body></html>' % trs
+
+
+def test_normalize_trackname():
+    assert normalize_trackname("Artist feat. Someone - Track (Original Mix)") == "artist ft someone track"
+    assert normalize_trackname("ARTIST ft Someone – Track [original mix]") == "artist ft someone track"
+    assert normalize_trackname("Träck  A (Extended Mix)") == "track a (extended mix)"
+    assert normalize_trackname(" - ") == ""
+
+
+def test_search_parses_result_rows():
+    page = search_page([("/track/t1/artist-track/", "Artist - Track"),
+                        (None, "Artist - Track (no link)"),
+                        ("https://www.1001tracklists.com/track/t2/x/", "Artist - Track (Remix)")])
+    with StandinServer({SEARCH: (200, page)}) as standin:
+        candidates = TLBackend(standin.baseurl).search_track("artist track")
+
+    assert [(c.id, c.name) for c in candidates] == [("t1", "Artist - Track"), ("t2", "Artist - Track (Remix)")]
+    assert standin.posted == [(SEARCH, {"main_search": "artist track", "search_selection": "2"})]
+
+
+def test_resolver_searches_once_per_normalized_name(tmp_path):
+    cachefile = str(tmp_path / "cache.txt")
+    names = ["Artist - Track", "artist – track (Original Mix)", "Artist - Track Remix", "  "]
+    page = search_page([("/track/t1/x/", "Artist - Track"), ("/track/t2/x/", "Artist - Track Remix")])
+    with StandinServer({SEARCH: (200, page)}) as standin:
+        matches = TrackNameResolver(cachefile, workers=2, interval=0, baseurl=standin.baseurl).resolve(names)
+        assert sorted(form["main_search"] for _, form in standin.posted) == ["artist track", "artist track remix"]
+
+        # a second run answers from the cache file
+        again = TrackNameResolver(cachefile, interval=0, baseurl=standin.baseurl).resolve(names)
+        assert len(standin.posted) == 2
+
+    assert [m.best().id if m.best() else None for m in matches] == ["t1", "t1", "t2", None]
+    assert [m.best().id if m.best() else None for m in again] == ["t1", "t1", "t2", None]
+
+
+def test_failed_searches_are_not_cached(tmp_path):
+    cachefile = str(tmp_path / "cache.txt")
+    with StandinServer({SEARCH: (503, "maintenance")}) as standin:
+        TrackNameResolver(cachefile, interval=0, baseurl=standin.baseurl).resolve(["Artist - Track"])
+        standin.page(SEARCH, search_page([("/track/t1/x/", "Artist - Track")]))
+        matches = TrackNameResolver(cachefile, interval=0, baseurl=standin.baseurl).resolve(["Artist - Track"])
+
+    assert len(standin.posted) == 2
+    assert matches[0].best().id == "t1"
+
+
+def test_seed_adds_the_best_matches_to_the_frontier(tmp_path):
+    for filename in ["tracks.txt", "artists.txt", "labels.txt", "tracklists.txt"]:
+        open(os.path.join(tmp_path, filename), "w").close()
+    with open(os.path.join(tmp_path, "tracks.txt"), "w") as file:
+        file.write(json.dumps({"id": "t1", "name": "Artist - Track"}) + "\n")
+    with open(os.path.join(tmp_path, "todo.json"), "w") as file:
+        json.dump({"tracks": ["t0"], "artists": [], "labels": [], "tracklists": []}, file)
+    playlist = tmp_path / "playlist.txt"
+    playlist.write_text("Artist - Track\nArtist - Track Remix\nSomething else entirely\n")
+
+    page = search_page([("/track/t1/x/", "Artist - Track"), ("/track/t2/x/", "Artist - Track Remix")])
+    with StandinServer({SEARCH: (200, page)}) as standin:
+        main_resolve.resolve_playlist(Namespace(playlist=str(playlist), output=str(tmp_path / "resolved.txt"),
+                                                cache=str(tmp_path / "cache.txt"), workers=1, interval=0,
+                                                seed=str(tmp_path), min_score=0.6, baseurl=standin.baseurl,
+                                                http2=False))
+
+    with open(os.path.join(tmp_path, "todo.json")) as file:
+        # t1 is crawled already
+        assert sorted(json.load(file)["tracks"]) == ["t0", "t2"]
@@ -0,0 +1,65 @@
+import json
+import os
+
+from crawler import bootstrap_frontier
+from domain import Track
+from failures import FailureLedger
+from sitemap import SitemapBootstrap, classify
+from standin import StandinServer
+from storage import TemporaryMusicStorage, TrackingMissingMusicStorage
+from tl1001 import TLBackend
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "sitemap")
+
+
+def sitemap_server() -> StandinServer:
+    pages = {}
+    for filename in os.listdir(FIXTURES):
+        with open(os.path.join(FIXTURES, filename), "rb") as file:
+            pages["/" + filename] = (200, file.read())
+    return StandinServer(pages)
+
+
+def test_classify():
+    assert classify("https://www.1001tracklists.com/tracklist/tl0/some-set.html") == ("tracklist", "tl0")
+    assert classify("https://www.1001tracklists.com/track/t0/some-track.html") == ("track", "t0")
+    assert classify("https://www.1001tracklists.com/about.html") is None
+
+
+def test_bootstrap_skips_crawled_and_failed_ids(tmp_path):
+    ledger = FailureLedger(str(tmp_path / "failed.txt"))
+    ledger.record("track", "t2", "not found")
+    musicstore = TrackingMissingMusicStorage(TemporaryMusicStorage(), ledger=ledger)
+    track = Track()
+    track.id = "t1"
+    musicstore.real.put_track(track.freeze())
+
+    with sitemap_server() as standin:
+        bootstrap = SitemapBootstrap(musicstore, TLBackend(standin.baseurl), scrape_timeout=0)
+        bootstrap.bootstrap()
+
+    assert musicstore.todo_tracks == {"t0", "t3", "t4"}
+    assert musicstore.todo_artists == {"a0"}
+    assert musicstore.todo_labels == {"l0"}
+    assert musicstore.todo_tracklists == {"tl0"}
+    assert bootstrap.sitemaps == 3
+    assert bootstrap.seen == {"track": 5, "artist": 1, "label": 1, "tracklist": 1}
+
+
+def test_bootstrap_frontier_extends_todo_json(tmp_path):
+    for filename in ["tracks.txt", "artists.txt", "labels.txt", "tracklists.txt"]:
+        open(tmp_path / filename, "w").close()
+    with open(tmp_path / "tracks.txt", "w") as file:
+        file.write(json.dumps({"id": "t0", "name": "crawled"}) + "\n")
+    with open(tmp_path / "todo.json", "w") as file:
+        json.dump({"tracks": ["t9"], "artists": [], "labels": [], "tracklists": []}, file)
+
+    with sitemap_server() as standin:
+        bootstrap_frontier(str(tmp_path), [standin.baseurl + "sitemap_tracks.xml.gz"], scrape_timeout=0,
+                           baseurl=standin.baseurl)
+        assert "/robots.txt" not in standin.requested
+
+    with open(tmp_path / "todo.json") as file:
+        todos = json.load(file)
+    assert sorted(todos["tracks"]) == ["t1", "t2", "t3", "t4", "t9"]
+    assert todos["artists"] == []
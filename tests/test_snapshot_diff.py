@@ -0,0 +1,67 @@
+import json
+
+import pytest
+
+from snapshot_diff import SnapshotDiff, sorted_records
+
+OLD = {
+    "tracks.txt": [
+        {"id": "t1", "name": "stale"},
+        {"id": "t0", "name": "a", "artists": ["a0", "a2"]},
+        {"id": "t2", "name": "gone"},
+        {"id": "t1", "name": "kept"},
+    ],
+    "artists.txt": [],
+    "labels.txt": [{"id": "l0", "name": "Label"}],
+}
+# t0 was crawled twice since, only its last copy counts. tracklists.txt does not exist in the old snapshot.
+NEW = {
+    "tracks.txt": [
+        {"id": "t0", "name": "a", "artists": ["a0", "a2"]},
+        {"id": "t3", "name": "added"},
+        {"id": "t1", "name": "kept"},
+        {"id": "t0", "name": "b", "artists": ["a1", "a0"]},
+    ],
+    "artists.txt": [{"id": "a0", "name": "Artist"}],
+    "labels.txt": [{"id": "l0", "name": "Label"}],
+    "tracklists.txt": [{"id": "tl0", "name": "Set", "tracks": ["t0"]}],
+}
+
+
+def write_snapshot(folder, files: dict) -> str:
+    folder.mkdir()
+    for filename, records in files.items():
+        with open(folder / filename, "w") as file:
+            file.writelines(json.dumps(record) + "\n" for record in records)
+    return str(folder)
+
+
+@pytest.mark.parametrize("run_size", [1, 2, 1000])
+def test_sorted_records_keep_the_last_copy(tmp_path, run_size):
+    folder = write_snapshot(tmp_path / "new", NEW)
+    records = list(sorted_records(folder + "/tracks.txt", str(tmp_path), run_size))
+    assert [(entityid, json.loads(line)["name"]) for entityid, line in records] == \
+        [("t0", "b"), ("t1", "kept"), ("t3", "added")]
+    # the runs are removed once the records are read
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["new"]
+
+
+def test_diff_with_single_record_runs(tmp_path):
+    old = write_snapshot(tmp_path / "old", OLD)
+    new = write_snapshot(tmp_path / "new", NEW)
+    output = str(tmp_path / "changes.txt")
+
+    counts = SnapshotDiff(old, new, run_size=1, tmpfolder=str(tmp_path)).diff(output)
+    with open(output) as file:
+        changes = [json.loads(line) for line in file]
+
+    assert changes == [
+        {"op": "add", "type": "artist", "id": "a0", "record": {"id": "a0", "name": "Artist"}},
+        {"op": "modify", "type": "track", "id": "t0",
+         "fields": {"name": {"old": "a", "new": "b"}, "artists": {"added": ["a1"], "removed": ["a2"]}}},
+        {"op": "remove", "type": "track", "id": "t2"},
+        {"op": "add", "type": "track", "id": "t3", "record": {"id": "t3", "name": "added"}},
+        {"op": "add", "type": "tracklist", "id": "tl0", "record": {"id": "tl0", "name": "Set", "tracks": ["t0"]}},
+    ]
+    assert counts["tracks"] == {"add": 1, "remove": 1, "modify": 1}
+    assert counts["labels"] == {"add": 0, "remove": 0, "modify": 0}
@@ -0,0 +1,32 @@
+import json
+
+from domain import Track
+from storage import TemporaryMusicStorage
+
+
+def make_track(trackid: str, name: str) -> Track:
+    track = Track()
+    track.id = trackid
+    track.name = name
+    return track.freeze()
+
+
+def no_duplicate_keys(pairs):
+    keys = [key for key, _ in pairs]
+    assert len(keys) == len(set(keys)), keys
+    return dict(pairs)
+
+
+def test_restored_records_are_written_once(tmp_path):
+    store = TemporaryMusicStorage(spill_folder=str(tmp_path), max_records=2)
+    for i in range(3):
+        store.put_track(make_track("t%d" % i, "first"))
+    store.put_track(make_track("t0", "second"))
+    store.spill()
+    store.put_track(make_track("t1", "third"))
+
+    store.store_to_disk(str(tmp_path / "store.json"))
+    with open(tmp_path / "store.json") as file:
+        tracks = json.load(file, object_pairs_hook=no_duplicate_keys)["tracks"]
+    assert {trackid: track["name"] for trackid, track in tracks.items()} == {"t0": "second", "t1": "third",
+                                                                             "t2": "first"}
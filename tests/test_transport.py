@@ -0,0 +1,63 @@
+import gzip
+
+import pytest
+
+pytest.importorskip("httpx")
+pytest.importorskip("h2")
+pytest.importorskip("hypercorn")
+
+from crawler import crawl_entity
+from domain import RateLimitException
+from failures import FailureLedger, RetryQueue
+from standin import Http2StandinServer, track_page, RATE_LIMIT_PAGE
+from storage import TemporaryMusicStorage, TrackingMissingMusicStorage
+from tl1001 import TLBackend
+from transport import http2_session
+
+# large enough that compression shows in the byte counts
+TRACK_PAGE = track_page("Track t0").replace("</body>", "<p>filler</p>" * 500 + "</body>")
+
+
+def test_http_baseurl_speaks_http2_and_accounts_transfer():
+    with Http2StandinServer({"/track/t0/": (200, TRACK_PAGE)}) as standin:
+        tlb = TLBackend(standin.baseurl, session=http2_session(standin.baseurl))
+        track = tlb.get_track("t0")
+        tlb.get_track("t0")
+
+    assert track.name == "Track t0"
+    assert standin.requested == [("/track/t0/", "2"), ("/track/t0/", "2")]
+    stats = tlb.session.stats.summary()["track"]
+    assert stats["requests"] == 2
+    assert stats["decoded_bytes"] == 2 * len(TRACK_PAGE.encode("utf8"))
+    assert stats["wire_bytes"] == 2 * len(gzip.compress(TRACK_PAGE.encode("utf8")))
+    assert stats["wire_bytes_per_request"] == stats["wire_bytes"] // 2
+
+
+def test_redirects_are_followed():
+    # a renamed track moved to a new id, its old page redirects there
+    pages = {"/track/old/": (301, "", {"Location": "/track/t0/"}), "/track/t0/": (200, TRACK_PAGE)}
+    with Http2StandinServer(pages) as standin:
+        tlb = TLBackend(standin.baseurl, session=http2_session(standin.baseurl))
+        track = tlb.get_track("old")
+
+    assert track.name == "Track t0"
+    assert standin.requested == [("/track/old/", "2"), ("/track/t0/", "2")]
+
+
+def test_ratelimit_page_raises():
+    with Http2StandinServer({"/track/t0/": (403, RATE_LIMIT_PAGE)}) as standin:
+        tlb = TLBackend(standin.baseurl, session=http2_session(standin.baseurl))
+        with pytest.raises(RateLimitException):
+            tlb.get_track("t0")
+
+
+def test_connection_errors_are_retried(tmp_path):
+    ledger = FailureLedger(str(tmp_path / "failed.txt"))
+    musicstore = TrackingMissingMusicStorage(TemporaryMusicStorage(), ledger=ledger)
+    retries = RetryQueue()
+    tlb = TLBackend("http://127.0.0.1:1/", session=http2_session("http://127.0.0.1:1/"))
+
+    crawl_entity(musicstore, tlb, retries, ledger, "track", "t0", 0)
+
+    assert retries.pending() == [("track", "t0")]
+    assert not ledger.has_failed("track", "t0")